@@ -2,7 +2,9 @@
 Database models and schema for the soccer players app.
 """
 
+from contextlib import closing
 from datetime import date
+from functools import lru_cache
 from typing import Optional
 import sqlite3
 from pathlib import Path
@@ -15,6 +17,11 @@ def get_db_connection():
     DATABASE_PATH.parent.mkdir(parents=True, exist_ok=True)
     conn = sqlite3.connect(str(DATABASE_PATH))
     conn.row_factory = sqlite3.Row
+    # Connections are opened per request, so their private page cache starts
+    # cold every time. Memory-mapping the file lets reads come straight from
+    # the OS page cache, which is shared across connections.
+    conn.execute("PRAGMA mmap_size = 268435456")
+    conn.execute("PRAGMA temp_store = MEMORY")
     return conn
 
 
@@ -23,6 +30,10 @@ def init_database():
     conn = get_db_connection()
     cursor = conn.cursor()
 
+    # WAL lets lookups keep reading while sessions and import scripts write.
+    # The journal mode is persistent, so setting it once at startup is enough.
+    cursor.execute("PRAGMA journal_mode = WAL")
+
     # Players table
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS players (
@@ -164,6 +175,37 @@ def init_database():
         END
     """)
 
+    # Bumped whenever the set of player names changes, including writes from
+    # the import scripts, so in-process caches built from the names (the
+    # fuzzy search Metaphone buckets) know when to rebuild
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS players_version (
+            version INTEGER NOT NULL
+        )
+    """)
+    cursor.execute("""
+        INSERT INTO players_version (version)
+        SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM players_version)
+    """)
+
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS players_version_ai AFTER INSERT ON players BEGIN
+            UPDATE players_version SET version = version + 1;
+        END
+    """)
+
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS players_version_ad AFTER DELETE ON players BEGIN
+            UPDATE players_version SET version = version + 1;
+        END
+    """)
+
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS players_version_au AFTER UPDATE OF normalized_name ON players BEGIN
+            UPDATE players_version SET version = version + 1;
+        END
+    """)
+
     conn.commit()
     conn.close()
 
@@ -403,14 +445,13 @@ def fts_search(query: str, limit: int = 20, use_prefix: bool = True) -> list[dic
     conn = get_db_connection()
     cursor = conn.cursor()
 
-    import unicodedata
-    import re
+    try:
+        from app.services.fuzzy_matching import normalize_name
+    except ImportError:
+        from backend.app.services.fuzzy_matching import normalize_name
 
     # Normalize the query the same way we normalize player names
-    normalized_query = unicodedata.normalize('NFKD', query)
-    normalized_query = ''.join(c for c in normalized_query if not unicodedata.combining(c))
-    normalized_query = normalized_query.lower().strip()
-    normalized_query = re.sub(r'\s+', ' ', normalized_query)
+    normalized_query = normalize_name(query)
 
     # Build FTS5 query - handle multiple words
     words = normalized_query.split()
@@ -442,6 +483,55 @@ def fts_search(query: str, limit: int = 20, use_prefix: bool = True) -> list[dic
         return []
 
 
+# Phonetic candidates per query word, so the bucket lookup cannot flood the
+# scoring loop on very common codes
+PHONETIC_CANDIDATE_LIMIT = 50
+
+# Columns of every fts_search_fuzzy candidate row, in SELECT order
+FUZZY_CANDIDATE_COLUMNS = ("id", "name", "nationality", "position", "wikidata_id", "normalized_name")
+
+# Up to 50 FTS candidates for one prefix variation; fts_search_fuzzy chains
+# one copy per variation with UNION ALL
+FUZZY_PREFIX_CANDIDATES_SQL = """
+    SELECT * FROM (
+        SELECT DISTINCT p.id, p.name, p.nationality, p.position, p.wikidata_id,
+               p.normalized_name
+        FROM players_fts fts
+        JOIN players p ON fts.rowid = p.id
+        WHERE players_fts MATCH ?
+        LIMIT 50
+    )
+"""
+
+
+@lru_cache(maxsize=1)
+def _metaphone_buckets(db_path: str, version: int) -> dict[str, dict[str, tuple[int, ...]]]:
+    """
+    Map the Metaphone code of every word in a player name to the words with
+    that code, and each word to the ids of the players whose name has it.
+
+    Built once and reused across requests. The players_version counter is
+    part of the cache key; triggers bump it on every insert, delete or
+    rename, so the buckets are rebuilt after any change to the names.
+    """
+    try:
+        from app.services.fuzzy_matching import metaphone
+    except ImportError:
+        from backend.app.services.fuzzy_matching import metaphone
+
+    buckets: dict[str, dict[str, list[int]]] = {}
+    with closing(sqlite3.connect(db_path)) as conn:
+        for player_id, normalized_name in conn.execute("SELECT id, normalized_name FROM players"):
+            for word in set(normalized_name.split()):
+                code = metaphone(word)
+                if code:
+                    buckets.setdefault(code, {}).setdefault(word, []).append(player_id)
+    return {
+        code: {word: tuple(ids) for word, ids in words.items()}
+        for code, words in buckets.items()
+    }
+
+
 def fts_search_fuzzy(query: str, limit: int = 20, max_distance: int = 2) -> list[dict]:
     """
     Fuzzy search combining FTS5 with Levenshtein distance filtering.
@@ -455,21 +545,22 @@ def fts_search_fuzzy(query: str, limit: int = 20, max_distance: int = 2) -> list
     """
     conn = get_db_connection()
     cursor = conn.cursor()
+    # Plain tuples for the candidate rows: most are rejected by scoring, so
+    # only the kept ones are turned into dicts
+    cursor.row_factory = None
 
-    import unicodedata
-    import re
+    # Import matching helpers - try both paths for different execution contexts
+    try:
+        from app.services.fuzzy_matching import levenshtein_distance, metaphone, normalize_name
+    except ImportError:
+        from backend.app.services.fuzzy_matching import levenshtein_distance, metaphone, normalize_name
 
     # Normalize the query
-    normalized_query = unicodedata.normalize('NFKD', query)
-    normalized_query = ''.join(c for c in normalized_query if not unicodedata.combining(c))
-    normalized_query = normalized_query.lower().strip()
-    normalized_query = re.sub(r'\s+', ' ', normalized_query)
+    normalized_query = normalize_name(query)
 
     # Strategy: Get candidates using multiple prefix variations
     words = normalized_query.split()
 
-    candidates = []
-
     def generate_prefix_variations(word: str, max_len: int = 5) -> set:
         """Generate prefix variations to catch common typos."""
         variations = set()
@@ -501,95 +592,126 @@ def fts_search_fuzzy(query: str, limit: int = 20, max_distance: int = 2) -> list
 
         return variations
 
-    try:
-        for word in words:
-            if len(word) >= 2:
-                # Generate prefix variations to catch typos
-                prefixes = generate_prefix_variations(word, max_len=5)
-
-                for prefix in prefixes:
-                    if len(prefix) >= 2:
-                        cursor.execute("""
-                            SELECT DISTINCT p.id, p.name, p.nationality, p.position, p.wikidata_id,
-                                   p.normalized_name
-                            FROM players_fts fts
-                            JOIN players p ON fts.rowid = p.id
-                            WHERE players_fts MATCH ?
-                            LIMIT 50
-                        """, (f'{prefix}*',))
-                        candidates.extend(cursor.fetchall())
+    # Apply length-based threshold
+    query_len = len(normalized_query)
+    if query_len <= 4:
+        threshold = 1
+    elif query_len <= 8:
+        threshold = 2
+    else:
+        threshold = 3
+
+    def score_candidate(candidate_normalized: str) -> Optional[float]:
+        """Rank a candidate against the query, or None if it is too far off."""
+        # Check distance for the full name. Only distances within the
+        # threshold matter, so let the banded DP bail out early.
+        distance = levenshtein_distance(normalized_query, candidate_normalized, max_distance=threshold)
+
+        # Also check if query matches any word in the name
+        candidate_words = candidate_normalized.split()
+        word_distances = [(levenshtein_distance(normalized_query, w, max_distance=threshold), w) for w in candidate_words]
+        min_word_distance, closest_word = min(word_distances, key=lambda x: x[0]) if word_distances else (distance, '')
+
+        if distance <= threshold < min_word_distance:
+            # The full name matched but no single word did; the closest
+            # word still drives the ranking below, so it needs exact distances
+            word_distances = [(levenshtein_distance(normalized_query, w), w) for w in candidate_words]
+            min_word_distance, closest_word = min(word_distances, key=lambda x: x[0])
 
-        conn.close()
+        # Use the better (lower) distance
+        best_distance = min(distance, min_word_distance)
+
+        if best_distance > threshold:
+            return None
+
+        # Score adjustments for better ranking:
+        # - Prefer when the matching word is the first word (likely first name/main name)
+        # - Prefer when query length is similar to matching word length
+        score = best_distance * 10  # Base score from distance
 
-        if not candidates:
-            return []
+        # Bonus for first word match
+        if closest_word and candidate_words and closest_word == candidate_words[0]:
+            score -= 2
 
-        # Remove duplicates
+        # Bonus for similar length (penalize if lengths differ significantly)
+        length_diff = abs(len(normalized_query) - len(closest_word)) if closest_word else 0
+        score += length_diff * 0.5
+
+        # Tiebreaker: prefer when ending matches (helps "christiano" -> "cristiano" over "christian")
+        # because the typo is usually at the beginning, not the end
+        if closest_word and len(closest_word) >= 3 and len(normalized_query) >= 3:
+            # Compare last 3 characters
+            if normalized_query[-3:] == closest_word[-3:]:
+                score -= 1
+            elif normalized_query[-2:] == closest_word[-2:]:
+                score -= 0.5
+
+        # Secondary tiebreaker: prefer shorter overall names (more likely to be famous single-name players)
+        score += len(candidate_normalized) * 0.01
+
+        return score
+
+    try:
+        # Dedupe and score candidates as they stream out of each FTS query,
+        # so rejected rows are never collected or copied
         seen = set()
-        unique_candidates = []
-        for c in candidates:
-            if c['id'] not in seen:
-                seen.add(c['id'])
-                unique_candidates.append(c)
-
-        # Import Levenshtein - try both paths for different execution contexts
-        try:
-            from app.services.fuzzy_matching import levenshtein_distance
-        except ImportError:
-            from backend.app.services.fuzzy_matching import levenshtein_distance
-
-        # Score candidates by Levenshtein distance to query
         scored = []
-        for candidate in unique_candidates:
-            candidate_normalized = candidate['normalized_name']
-
-            # Check distance for the full name
-            distance = levenshtein_distance(normalized_query, candidate_normalized)
+        for word in words:
+            if len(word) >= 2:
+                # Generate prefix variations to catch typos
+                prefixes = [p for p in generate_prefix_variations(word, max_len=5) if len(p) >= 2]
+                if not prefixes:
+                    continue
+
+                # One statement for all of the word's variations: each gets
+                # its own FTS lookup and LIMIT, and their rows come back one
+                # variation after another, as separate queries would return them
+                cursor.execute(
+                    " UNION ALL ".join([FUZZY_PREFIX_CANDIDATES_SQL] * len(prefixes)),
+                    [f'{prefix}*' for prefix in prefixes]
+                )
+
+                for candidate in cursor:
+                    if candidate[0] in seen:
+                        continue
+                    seen.add(candidate[0])
+
+                    score = score_candidate(candidate[5])
+                    if score is not None:
+                        scored.append((score, dict(zip(FUZZY_CANDIDATE_COLUMNS, candidate))))
+
+        # Players whose name has a word that sounds like a query word, for
+        # typos early in the word that no prefix variation reaches
+        version = cursor.execute("SELECT version FROM players_version").fetchone()[0]
+        buckets = _metaphone_buckets(str(DATABASE_PATH), version)
+        for word in words:
+            if len(word) >= 2:
+                # Closest-spelled words first, so the cap keeps the likeliest
+                # players rather than the earliest imported ones
+                bucket = buckets.get(metaphone(word), {})
+                unseen = []
+                for _, bucket_word in sorted((levenshtein_distance(word, w), w) for w in bucket):
+                    unseen.extend(player_id for player_id in bucket[bucket_word] if player_id not in seen)
+                    if len(unseen) >= PHONETIC_CANDIDATE_LIMIT:
+                        break
+                unseen = list(dict.fromkeys(unseen))[:PHONETIC_CANDIDATE_LIMIT]
+                if not unseen:
+                    continue
+                seen.update(unseen)
+
+                placeholders = ",".join("?" * len(unseen))
+                cursor.execute(f"""
+                    SELECT id, name, nationality, position, wikidata_id, normalized_name
+                    FROM players
+                    WHERE id IN ({placeholders})
+                """, unseen)
+
+                for candidate in cursor:
+                    score = score_candidate(candidate[5])
+                    if score is not None:
+                        scored.append((score, dict(zip(FUZZY_CANDIDATE_COLUMNS, candidate))))
 
-            # Also check if query matches any word in the name
-            candidate_words = candidate_normalized.split()
-            word_distances = [(levenshtein_distance(normalized_query, w), w) for w in candidate_words]
-            min_word_distance, closest_word = min(word_distances, key=lambda x: x[0]) if word_distances else (distance, '')
-
-            # Use the better (lower) distance
-            best_distance = min(distance, min_word_distance)
-
-            # Apply length-based threshold
-            query_len = len(normalized_query)
-            if query_len <= 4:
-                threshold = 1
-            elif query_len <= 8:
-                threshold = 2
-            else:
-                threshold = 3
-
-            if best_distance <= threshold:
-                # Score adjustments for better ranking:
-                # - Prefer when the matching word is the first word (likely first name/main name)
-                # - Prefer when query length is similar to matching word length
-                score = best_distance * 10  # Base score from distance
-
-                # Bonus for first word match
-                if closest_word and candidate_words and closest_word == candidate_words[0]:
-                    score -= 2
-
-                # Bonus for similar length (penalize if lengths differ significantly)
-                length_diff = abs(len(normalized_query) - len(closest_word)) if closest_word else 0
-                score += length_diff * 0.5
-
-                # Tiebreaker: prefer when ending matches (helps "christiano" -> "cristiano" over "christian")
-                # because the typo is usually at the beginning, not the end
-                if closest_word and len(closest_word) >= 3 and len(normalized_query) >= 3:
-                    # Compare last 3 characters
-                    if normalized_query[-3:] == closest_word[-3:]:
-                        score -= 1
-                    elif normalized_query[-2:] == closest_word[-2:]:
-                        score -= 0.5
-
-                # Secondary tiebreaker: prefer shorter overall names (more likely to be famous single-name players)
-                score += len(candidate_normalized) * 0.01
-
-                scored.append((score, dict(candidate)))
+        conn.close()
 
         # Sort by distance and return top results
         scored.sort(key=lambda x: x[0])
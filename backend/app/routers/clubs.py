@@ -5,23 +5,14 @@ Club search and roster endpoints.
 from fastapi import APIRouter, Query
 from pydantic import BaseModel
 from typing import Optional
-import unicodedata
 import re
 
 from app.models.database import get_db_connection
+from app.services.fuzzy_matching import normalize_name
 
 router = APIRouter()
 
 
-def normalize_name(name: str) -> str:
-    """Normalize a name for matching."""
-    normalized = unicodedata.normalize('NFKD', name)
-    normalized = ''.join(c for c in normalized if not unicodedata.combining(c))
-    normalized = normalized.lower().strip()
-    normalized = re.sub(r'\s+', ' ', normalized)
-    return normalized
-
-
 def format_national_team_name(name: str) -> str:
     """
     Convert long national team names to short display format.
@@ -5,12 +5,11 @@ Player lookup and search endpoints.
 from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
 from typing import Optional
-import unicodedata
-import re
 from datetime import datetime
 
 from app.models.database import get_db_connection, fts_search, fts_search_fuzzy
 from app.routers.clubs import format_national_team_name
+from app.services.fuzzy_matching import normalize_name
 
 
 def calculate_club_duration_years(start_date: Optional[str], end_date: Optional[str]) -> float:
@@ -106,14 +105,24 @@ KNOWN_MONONYMS = {
 
 router = APIRouter()
 
-
-def normalize_name(name: str) -> str:
-    """Normalize a name for matching."""
-    normalized = unicodedata.normalize('NFKD', name)
-    normalized = ''.join(c for c in normalized if not unicodedata.combining(c))
-    normalized = normalized.lower().strip()
-    normalized = re.sub(r'\s+', ' ', normalized)
-    return normalized
+# Tier 0 is exact normalized matches, tier 1 up to 10 prefix-only matches.
+# The prefix tier is a range on normalized_name (:q <= name < :q_end, where
+# :q_end is :q plus the highest code point) so it is an index range scan;
+# LIKE cannot use the case-sensitive index. ORDER BY id keeps the table-scan
+# order the LIMIT used to pick from.
+EXACT_OR_PREFIX_SQL = """
+    SELECT 0 AS tier, id, name, nationality, position, wikidata_id
+    FROM players
+    WHERE normalized_name = :q
+    UNION ALL
+    SELECT * FROM (
+        SELECT 1 AS tier, id, name, nationality, position, wikidata_id
+        FROM players
+        WHERE normalized_name > :q AND normalized_name < :q_end
+        ORDER BY id
+        LIMIT 10
+    )
+"""
 
 
 class ClubHistory(BaseModel):
@@ -228,24 +237,14 @@ async def lookup_player(name: str = Query(..., min_length=2, description="Player
     conn = get_db_connection()
     cursor = conn.cursor()
 
-    # Try exact normalized match first
-    cursor.execute("""
-        SELECT id, name, nationality, position, wikidata_id
-        FROM players
-        WHERE normalized_name = ?
-    """, (normalized,))
+    # Exact normalized match first, then partial match (starts with).
+    # Both tiers come back from one query; exact matches win if there are any.
+    cursor.execute(EXACT_OR_PREFIX_SQL, {"q": normalized, "q_end": normalized + "\U0010ffff"})
 
-    rows = cursor.fetchall()
-
-    if len(rows) == 0:
-        # Try partial match (starts with)
-        cursor.execute("""
-            SELECT id, name, nationality, position, wikidata_id
-            FROM players
-            WHERE normalized_name LIKE ?
-            LIMIT 10
-        """, (normalized + "%",))
-        rows = cursor.fetchall()
+    tiers = ([], [])
+    for row in cursor.fetchall():
+        tiers[row['tier']].append(row)
+    rows = tiers[0] or tiers[1]
 
     if len(rows) == 0:
         # Try FTS5 full-text search with prefix matching
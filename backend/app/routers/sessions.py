@@ -9,6 +9,7 @@ from datetime import datetime
 
 from app.models.database import get_db_connection
 from app.routers.clubs import format_national_team_name
+from app.services.fuzzy_matching import normalize_name
 
 router = APIRouter()
 
@@ -314,6 +315,8 @@ async def get_players_by_club(session_id: int, club_name: str = Query(..., min_l
     conn = get_db_connection()
     cursor = conn.cursor()
 
+    # Match against the normalized name stored at ingest rather than
+    # lowercasing every joined club name per row
     cursor.execute("""
         SELECT DISTINCT p.id, p.name, p.nationality, p.position
         FROM guessed_players gp
@@ -321,9 +324,9 @@ async def get_players_by_club(session_id: int, club_name: str = Query(..., min_l
         JOIN player_clubs pc ON p.id = pc.player_id
         JOIN clubs c ON pc.club_id = c.id
         WHERE gp.session_id = ?
-          AND LOWER(c.name) LIKE LOWER(?)
+          AND c.normalized_name LIKE ?
         ORDER BY p.name
-    """, (session_id, f"%{club_name}%"))
+    """, (session_id, f"%{normalize_name(club_name)}%"))
 
     players = [
         {
@@ -350,12 +353,13 @@ async def get_players_by_nationality(session_id: int, nationality: str = Query(.
     conn = get_db_connection()
     cursor = conn.cursor()
 
+    # LIKE is already case-insensitive, so no per-row LOWER() is needed
     cursor.execute("""
         SELECT p.id, p.name, p.nationality, p.position
         FROM guessed_players gp
         JOIN players p ON gp.player_id = p.id
         WHERE gp.session_id = ?
-          AND LOWER(p.nationality) LIKE LOWER(?)
+          AND p.nationality LIKE ?
         ORDER BY p.name
     """, (session_id, f"%{nationality}%"))
 
@@ -9,13 +9,50 @@ This module provides algorithms for matching player names with tolerance for:
 Key principle: Accept close matches silently without revealing answers.
 """
 
+import re
+import unicodedata
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import Optional
 
+try:
+    # Optional C++ Levenshtein (bit-parallel); the pure-Python version below
+    # gives identical results and is used when it is not installed
+    from rapidfuzz.distance import Levenshtein as _rapidfuzz_levenshtein
+except ImportError:
+    _rapidfuzz_levenshtein = None
 
-@dataclass
+# Names made only of Latin-1 and Latin Extended-A characters (nearly all
+# player and club names) are normalized with one str.translate call.
+_LATIN_EXTENDED_A_END = '\u017f'
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def _strip_diacritics(text: str) -> str:
+    """Decompose text (NFKD) and drop the combining marks."""
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(c for c in decomposed if not unicodedata.combining(c))
+
+
+# Per-character result of _strip_diacritics for every non-ASCII character up
+# to the end of Latin Extended-A, e.g. "é" -> "e", "ĳ" -> "ij".
+_DIACRITIC_MAP = {
+    code_point: _strip_diacritics(chr(code_point))
+    for code_point in range(0x80, ord(_LATIN_EXTENDED_A_END) + 1)
+    if _strip_diacritics(chr(code_point)) != chr(code_point)
+}
+
+
+@dataclass(slots=True, frozen=True)
 class FuzzyMatchResult:
-    """Result of a fuzzy match comparison."""
+    """
+    Result of a fuzzy match comparison. Immutable, so results can be shared.
+
+    edit_distance is exact, except for multi-part names that
+    fuzzy_match_name rejects early: there it is a lower bound on the summed
+    part distances (and confidence an upper bound to match). Such results
+    always have is_match False.
+    """
     is_match: bool
     confidence: float  # 0.0 to 1.0
     edit_distance: int
@@ -23,39 +60,151 @@ class FuzzyMatchResult:
     reason: str
 
 
-def levenshtein_distance(s1: str, s2: str) -> int:
+def normalize_name(name: str) -> str:
+    """
+    Normalize a name for matching: remove diacritics, lowercase, and
+    collapse whitespace.
+
+    Examples:
+        normalize_name("Mesut Özil") -> "mesut ozil"
+        normalize_name("  Kevin  De Bruyne ") -> "kevin de bruyne"
+    """
+    if max(name, default='') <= _LATIN_EXTENDED_A_END:
+        normalized = name.translate(_DIACRITIC_MAP)
+    else:
+        normalized = _strip_diacritics(name)
+    normalized = normalized.lower().strip()
+    return _WHITESPACE_RE.sub(' ', normalized)
+
+
+def levenshtein_distance(s1: str, s2: str, max_distance: Optional[int] = None) -> int:
     """
     Calculate the Levenshtein (edit) distance between two strings.
 
     This is the minimum number of single-character edits (insertions,
     deletions, or substitutions) required to change one string into the other.
 
+    If max_distance is given, only the diagonal band of width max_distance is
+    computed and max_distance + 1 is returned as soon as the distance is known
+    to exceed it. Callers that only compare against a threshold should pass it.
+
     Examples:
         levenshtein_distance("ronaldo", "ronalod") -> 2 (transposition = 2 edits)
         levenshtein_distance("messi", "mesi") -> 1 (deletion)
         levenshtein_distance("neymar", "neymar") -> 0 (identical)
+        levenshtein_distance("messi", "ronaldo", max_distance=2) -> 3 (cut off)
     """
+    if _rapidfuzz_levenshtein is not None:
+        return _rapidfuzz_levenshtein.distance(s1, s2, score_cutoff=max_distance)
+    return _levenshtein_distance_py(s1, s2, max_distance)
+
+
+def _levenshtein_distance_py(s1: str, s2: str, max_distance: Optional[int] = None) -> int:
+    """Pure-Python levenshtein_distance (two-row Wagner-Fischer)."""
     if len(s1) < len(s2):
         s1, s2 = s2, s1
 
+    # A shared prefix or suffix never needs an edit, so only the differing
+    # middle goes through the DP (e.g. "ronaldinho"/"ronaldino" -> "h"/"")
+    start, end1, end2 = 0, len(s1), len(s2)
+    while start < end2 and s1[start] == s2[start]:
+        start += 1
+    while end2 > start and s1[end1 - 1] == s2[end2 - 1]:
+        end1 -= 1
+        end2 -= 1
+    if start or end2 < len(s2):
+        s1, s2 = s1[start:end1], s2[start:end2]
+
+    if max_distance is not None:
+        return _banded_levenshtein(s1, s2, max_distance)
+
     if len(s2) == 0:
         return len(s1)
 
-    previous_row = range(len(s2) + 1)
+    # Two rows allocated once and swapped, rather than a new list per row
+    previous_row = list(range(len(s2) + 1))
+    current_row = [0] * (len(s2) + 1)
 
     for i, c1 in enumerate(s1):
-        current_row = [i + 1]
+        current_row[0] = i + 1
         for j, c2 in enumerate(s2):
             # Cost is 0 if characters match, 1 otherwise
             insertions = previous_row[j + 1] + 1
             deletions = current_row[j] + 1
             substitutions = previous_row[j] + (c1 != c2)
-            current_row.append(min(insertions, deletions, substitutions))
-        previous_row = current_row
+            current_row[j + 1] = min(insertions, deletions, substitutions)
+        previous_row, current_row = current_row, previous_row
 
     return previous_row[-1]
 
 
+def _banded_levenshtein(s1: str, s2: str, max_distance: int) -> int:
+    """
+    Levenshtein distance restricted to cells within max_distance of the diagonal.
+
+    Expects len(s1) >= len(s2). Any cell further than max_distance from the
+    diagonal already costs more than max_distance, so it is treated as
+    max_distance + 1 and the loop bails out once a whole row exceeds the limit.
+    """
+    cutoff = max_distance + 1
+    len1, len2 = len(s1), len(s2)
+
+    if len1 - len2 > max_distance:
+        return cutoff
+    if len2 == 0:
+        return len1
+
+    # Two rows allocated once and swapped. Cells right of the band have never
+    # been written and stay at cutoff; the one cell left of it was written two
+    # rows ago and is reset below.
+    previous_row = [j if j <= max_distance else cutoff for j in range(len2 + 1)]
+    current_row = [cutoff] * (len2 + 1)
+
+    for i in range(1, len1 + 1):
+        c1 = s1[i - 1]
+        current_row[0] = i if i <= max_distance else cutoff
+        row_min = current_row[0]
+
+        band_start = max(1, i - max_distance)
+        if band_start > 1:
+            current_row[band_start - 1] = cutoff
+        for j in range(band_start, min(len2, i + max_distance) + 1):
+            cost = min(
+                previous_row[j] + 1,                     # insertion
+                current_row[j - 1] + 1,                  # deletion
+                previous_row[j - 1] + (c1 != s2[j - 1]), # substitution
+            )
+            if cost > cutoff:
+                cost = cutoff
+            current_row[j] = cost
+            if cost < row_min:
+                row_min = cost
+
+        if row_min > max_distance:
+            return cutoff
+        previous_row, current_row = current_row, previous_row
+
+    return previous_row[len2]
+
+
+# Soundex digit for each coded letter. ASCII digits in the input are dropped
+# by the translation so that only these codes survive _SOUNDEX_NON_CODE_RE.
+_SOUNDEX_CODES = {
+    'B': '1', 'F': '1', 'P': '1', 'V': '1',
+    'C': '2', 'G': '2', 'J': '2', 'K': '2', 'Q': '2', 'S': '2', 'X': '2', 'Z': '2',
+    'D': '3', 'T': '3',
+    'L': '4',
+    'M': '5', 'N': '5',
+    'R': '6',
+}
+_SOUNDEX_TABLE = str.maketrans({**dict.fromkeys('0123456789'), **_SOUNDEX_CODES})
+_SOUNDEX_NON_CODE_RE = re.compile(r'[^1-6]+')
+_SOUNDEX_RUN_RE = re.compile(r'([1-6])\1+')
+
+
+# Phonetic codes depend only on the name, and the same names and name parts
+# come up again and again across queries, so both encoders are memoized
+@lru_cache(maxsize=4096)
 def soundex(name: str) -> str:
     """
     Generate the Soundex code for a name.
@@ -78,25 +227,14 @@ def soundex(name: str) -> str:
     # Keep first letter
     first_letter = name[0]
 
-    # Soundex coding
-    codes = {
-        'B': '1', 'F': '1', 'P': '1', 'V': '1',
-        'C': '2', 'G': '2', 'J': '2', 'K': '2', 'Q': '2', 'S': '2', 'X': '2', 'Z': '2',
-        'D': '3', 'T': '3',
-        'L': '4',
-        'M': '5', 'N': '5',
-        'R': '6',
-    }
-
-    # Encode the rest
-    encoded = first_letter
-    prev_code = codes.get(first_letter, '0')
-
-    for char in name[1:]:
-        code = codes.get(char, '0')
-        if code != '0' and code != prev_code:
-            encoded += code
-        prev_code = code if code != '0' else prev_code
+    # Code every letter in one C-level pass; letters without a code, and
+    # anything else, carry no digit
+    digits = _SOUNDEX_NON_CODE_RE.sub('', name.translate(_SOUNDEX_TABLE))
+
+    # Adjacent equal codes collapse to one, even across uncoded letters, and
+    # a code equal to the first letter's own is not repeated
+    first_code = digits[0] if first_letter in _SOUNDEX_CODES else ''
+    encoded = first_letter + _SOUNDEX_RUN_RE.sub(r'\1', digits)[len(first_code):]
 
     # Pad with zeros or truncate to 4 characters
     encoded = (encoded + '000')[:4]
@@ -104,6 +242,7 @@ def soundex(name: str) -> str:
     return encoded
 
 
+@lru_cache(maxsize=4096)
 def metaphone(name: str) -> str:
     """
     Generate the Metaphone code for a name.
@@ -174,6 +313,11 @@ def metaphone(name: str) -> str:
     return ''.join(result)
 
 
+# Edit threshold by name length, indexed directly by the inner matching
+# loops. Lengths past the end of the table all share its last threshold.
+_EDIT_THRESHOLDS = bytes([0] * 5 + [1] * 4 + [2] * 247)
+
+
 def get_edit_threshold(name_length: int) -> int:
     """
     Get the allowed edit distance threshold based on name length.
@@ -186,12 +330,17 @@ def get_edit_threshold(name_length: int) -> int:
     This prevents "Messi" from matching "Maser" while allowing
     "Ronaldinho" to match "Ronaldino".
     """
-    if name_length <= 4:
-        return 0
-    elif name_length <= 8:
-        return 1
-    else:
-        return 2
+    return _EDIT_THRESHOLDS[min(max(name_length, 0), 255)]
+
+
+# Results are immutable, so every exact match can share one instance
+_EXACT_MATCH = FuzzyMatchResult(
+    is_match=True,
+    confidence=1.0,
+    edit_distance=0,
+    phonetic_match=True,
+    reason="exact_match"
+)
 
 
 def fuzzy_match(query: str, target: str, use_phonetics: bool = True) -> FuzzyMatchResult:
@@ -211,13 +360,45 @@ def fuzzy_match(query: str, target: str, use_phonetics: bool = True) -> FuzzyMat
     """
     # Exact match is always a match
     if query == target:
-        return FuzzyMatchResult(
-            is_match=True,
-            confidence=1.0,
-            edit_distance=0,
-            phonetic_match=True,
-            reason="exact_match"
-        )
+        return _EXACT_MATCH
+
+    # Every part of the result is symmetric in its two arguments, so (a, b)
+    # and (b, a) share one cache entry
+    if query > target:
+        query, target = target, query
+    return _fuzzy_match_cached(query, target, use_phonetics)
+
+
+# FuzzyMatchResult is frozen, so cached results can be handed to every caller
+@lru_cache(maxsize=8192)
+def _fuzzy_match_cached(query: str, target: str, use_phonetics: bool) -> FuzzyMatchResult:
+    if not use_phonetics:
+        return _fuzzy_match_precomputed(query, target, "", "", "", "")
+
+    return _fuzzy_match_precomputed(
+        query, target,
+        soundex(query), metaphone(query),
+        soundex(target), metaphone(target)
+    )
+
+
+def _fuzzy_match_precomputed(
+    query: str,
+    target: str,
+    query_soundex: str,
+    query_metaphone: str,
+    target_soundex: str,
+    target_metaphone: str
+) -> FuzzyMatchResult:
+    """
+    fuzzy_match with the phonetic codes already computed.
+
+    Empty codes never count as a phonetic match, so passing "" for all four
+    disables phonetics.
+    """
+    # Exact match is always a match
+    if query == target:
+        return _EXACT_MATCH
 
     # Calculate edit distance
     edit_dist = levenshtein_distance(query, target)
@@ -225,20 +406,13 @@ def fuzzy_match(query: str, target: str, use_phonetics: bool = True) -> FuzzyMat
     # Use the SHORTER string's length for threshold to be conservative
     # This prevents "ronaldo" from matching "ronaldinho"
     min_length = min(len(query), len(target))
-    threshold = get_edit_threshold(min_length)
+    threshold = _EDIT_THRESHOLDS[min(min_length, 255)]
 
     # Check phonetic similarity
-    phonetic_match = False
-    if use_phonetics:
-        query_soundex = soundex(query)
-        target_soundex = soundex(target)
-        query_metaphone = metaphone(query)
-        target_metaphone = metaphone(target)
-
-        phonetic_match = (
-            (query_soundex == target_soundex and query_soundex != "") or
-            (query_metaphone == target_metaphone and query_metaphone != "")
-        )
+    phonetic_match = (
+        (query_soundex == target_soundex and query_soundex != "") or
+        (query_metaphone == target_metaphone and query_metaphone != "")
+    )
 
     # Determine if it's a match
     is_edit_match = edit_dist <= threshold and edit_dist > 0
@@ -282,12 +456,16 @@ def fuzzy_match(query: str, target: str, use_phonetics: bool = True) -> FuzzyMat
     )
 
 
+@lru_cache(maxsize=8192)
 def fuzzy_match_name(query: str, target: str) -> FuzzyMatchResult:
     """
     Fuzzy match specifically for player names, handling multi-part names.
 
     For names with multiple parts (e.g., "Cristiano Ronaldo"), we match
-    each part and combine the results.
+    each part and combine the results. Names that are clearly too far apart
+    are rejected with a single banded comparison of the whole string; their
+    edit_distance is then a lower bound rather than the exact part-wise sum
+    (see FuzzyMatchResult).
     """
     query_parts = query.split()
     target_parts = target.split()
@@ -296,17 +474,37 @@ def fuzzy_match_name(query: str, target: str) -> FuzzyMatchResult:
     if len(query_parts) != len(target_parts):
         return fuzzy_match(query, target)
 
-    # Match each part
-    total_edit_dist = 0
-    all_phonetic = True
-
-    for q_part, t_part in zip(query_parts, target_parts):
-        part_result = fuzzy_match(q_part, t_part)
-        total_edit_dist += part_result.edit_distance
-        all_phonetic = all_phonetic and part_result.phonetic_match
-
     # Use the sum of thresholds for multi-part names
-    total_threshold = sum(get_edit_threshold(len(p)) for p in target_parts)
+    total_threshold = sum(_EDIT_THRESHOLDS[min(len(p), 255)] for p in target_parts)
+
+    # Editing part by part is one way of editing the joined name, so the
+    # whole-string distance is a lower bound on the summed part distances.
+    # When even that is past the phonetic allowance, no part-wise comparison
+    # can match and a single banded DP is enough to reject.
+    joined_query = " ".join(query_parts)
+    joined_target = " ".join(target_parts)
+    whole_edit_dist = levenshtein_distance(joined_query, joined_target, max_distance=total_threshold + 1)
+    if whole_edit_dist > total_threshold + 1:
+        max_length = max(len(query), len(target))
+        return FuzzyMatchResult(
+            is_match=False,
+            confidence=max(0.0, 1.0 - (whole_edit_dist / max_length)),
+            edit_distance=whole_edit_dist,
+            # The same all-parts test as below, from the cached codes
+            phonetic_match=all(
+                q == t
+                or (soundex(q) == soundex(t) and soundex(q) != "")
+                or (metaphone(q) == metaphone(t) and metaphone(q) != "")
+                for q, t in zip(query_parts, target_parts)
+            ),
+            reason="no_match"
+        )
+
+    # Close enough to be a candidate - match the parts pairwise in one pass
+    # over the two parallel token lists
+    part_results = list(map(fuzzy_match, query_parts, target_parts))
+    total_edit_dist = sum(r.edit_distance for r in part_results)
+    all_phonetic = all(r.phonetic_match for r in part_results)
 
     is_match = total_edit_dist <= total_threshold or (all_phonetic and total_edit_dist <= total_threshold + 1)
 
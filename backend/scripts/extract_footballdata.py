@@ -15,21 +15,27 @@ Usage:
 
 import argparse
 import hashlib
+import http.client
 import json
 import os
 import sqlite3
 import sys
+import threading
 import time
-from datetime import datetime
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from urllib.request import Request, urlopen
-from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode, urlsplit
 
 # ---------------------------------------------------------------------------
 # Constants
 # ---------------------------------------------------------------------------
 
 BASE_URL = "https://api.football-data.org/v4"
+API_HOST = urlsplit(BASE_URL).netloc
+API_PATH_PREFIX = urlsplit(BASE_URL).path
 
 DEFAULT_DB_PATH = str(Path(__file__).parent.parent / "data" / "footballdata.db")
 
@@ -39,6 +45,13 @@ FREE_TIER_COMPETITIONS = [
 
 DEFAULT_SEASONS = list(range(2021, 2026))
 
+# Concurrent match fetches in sync-lineups. The rate limiter still caps the
+# request rate; the workers only overlap the network round trips.
+LINEUP_FETCH_WORKERS = 4
+
+# Rows buffered by reparse and lineup replay before each batched write
+REPARSE_BATCH_SIZE = 1000
+
 # ---------------------------------------------------------------------------
 # Database setup
 # ---------------------------------------------------------------------------
@@ -49,7 +62,7 @@ CREATE TABLE IF NOT EXISTS api_responses (
     endpoint TEXT NOT NULL,
     params TEXT NOT NULL,
     params_hash TEXT NOT NULL UNIQUE,
-    response_json TEXT NOT NULL,
+    response_json TEXT NOT NULL,  -- zlib-compressed BLOB (older rows: plain JSON text)
     http_status INTEGER NOT NULL,
     fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
@@ -67,15 +80,20 @@ CREATE TABLE IF NOT EXISTS teams (
     short_name TEXT,
     tla TEXT,
     crest_url TEXT,
-    area_name TEXT
+    area_name TEXT,
+    normalized_name TEXT  -- filled in by merge_footballdata.py
 );
 
+-- Link tables keyed only by their columns are stored WITHOUT ROWID, so the
+-- key is the table b-tree itself instead of a rowid table plus a separate
+-- unique index. (Databases created before this keep the rowid layout;
+-- the constraint and INSERT OR IGNORE behave the same either way.)
 CREATE TABLE IF NOT EXISTS team_competitions (
     team_id INTEGER NOT NULL,
     competition_id INTEGER NOT NULL,
     season INTEGER NOT NULL,
-    UNIQUE(team_id, competition_id, season)
-);
+    PRIMARY KEY(team_id, competition_id, season)
+) WITHOUT ROWID;
 
 CREATE TABLE IF NOT EXISTS persons (
     id INTEGER PRIMARY KEY,
@@ -84,7 +102,8 @@ CREATE TABLE IF NOT EXISTS persons (
     last_name TEXT,
     date_of_birth TEXT,
     nationality TEXT,
-    position TEXT
+    position TEXT,
+    normalized_name TEXT  -- filled in by merge_footballdata.py
 );
 
 CREATE TABLE IF NOT EXISTS matches (
@@ -117,30 +136,76 @@ CREATE TABLE IF NOT EXISTS sync_status (
     season INTEGER NOT NULL,
     step TEXT NOT NULL,
     completed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    UNIQUE(competition_code, season, step)
-);
+    PRIMARY KEY(competition_code, season, step)
+) WITHOUT ROWID;
 
 CREATE INDEX IF NOT EXISTS idx_api_responses_hash ON api_responses(params_hash);
+CREATE INDEX IF NOT EXISTS idx_api_responses_endpoint ON api_responses(endpoint, http_status);
 CREATE INDEX IF NOT EXISTS idx_matches_comp_season ON matches(competition_id, season);
+CREATE INDEX IF NOT EXISTS idx_matches_comp_status_season ON matches(competition_id, status, season);
 CREATE INDEX IF NOT EXISTS idx_match_lineups_match ON match_lineups(match_id);
 CREATE INDEX IF NOT EXISTS idx_match_lineups_person ON match_lineups(person_id);
+CREATE INDEX IF NOT EXISTS idx_teams_normalized_name ON teams(normalized_name);
+CREATE INDEX IF NOT EXISTS idx_persons_normalized_name ON persons(normalized_name);
+
+-- A renamed team or person gets its normalized name recomputed on the next merge
+CREATE TRIGGER IF NOT EXISTS teams_name_au AFTER UPDATE OF name ON teams
+WHEN new.name IS NOT old.name
+BEGIN
+    UPDATE teams SET normalized_name = NULL WHERE id = new.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS persons_name_au AFTER UPDATE OF name ON persons
+WHEN new.name IS NOT old.name
+BEGIN
+    UPDATE persons SET normalized_name = NULL WHERE id = new.id;
+END;
 """
 
+# Columns added to tables after the first release. CREATE TABLE IF NOT EXISTS
+# leaves existing tables alone, so older databases get them via ALTER TABLE.
+ADDED_COLUMNS = [
+    ("teams", "normalized_name", "TEXT"),
+    ("persons", "normalized_name", "TEXT"),
+]
+
 
 def init_db(db_path: str) -> sqlite3.Connection:
-    conn = sqlite3.connect(db_path)
+    # Room for every statement the script uses, so hot parser SQL is only
+    # prepared once per connection
+    conn = sqlite3.connect(db_path, cached_statements=256)
     conn.execute("PRAGMA journal_mode=WAL")
     conn.execute("PRAGMA foreign_keys=ON")
+    # Bulk ingest settings: NORMAL sync is crash-safe under WAL (only the last
+    # commits can be lost on power failure), a 64 MiB page cache and mmap keep
+    # the indexes in memory, and fewer checkpoints mean fewer WAL rewrites.
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-65536")
+    conn.execute("PRAGMA mmap_size=268435456")
+    conn.execute("PRAGMA wal_autocheckpoint=10000")
+    for table, column, column_type in ADDED_COLUMNS:
+        columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        if columns and column not in columns:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
     conn.executescript(SCHEMA_SQL)
     conn.commit()
     return conn
 
 
+def close_db(conn: sqlite3.Connection):
+    # Refresh query planner statistics for tables that changed a lot
+    conn.execute("PRAGMA optimize")
+    conn.close()
+
+
 # ---------------------------------------------------------------------------
 # API key resolution
 # ---------------------------------------------------------------------------
 
+@lru_cache(maxsize=None)
 def resolve_api_key(cli_key: str | None) -> str:
+    # Memoized so programmatic callers read the environment and .env only once
     if cli_key:
         return cli_key
 
@@ -173,20 +238,36 @@ class RateLimiter:
     def __init__(self, max_requests: int = 10, window_seconds: int = 60):
         self.max_requests = max_requests
         self.window_seconds = window_seconds
-        self.timestamps: list[float] = []
+        # Monotonic clock readings, oldest first
+        self.timestamps: deque[float] = deque()
+        # Shared by the lineup fetch workers; callers queue up behind a sleep
+        self.lock = threading.Lock()
+        # Monotonic time before which no request may go out (set on a 429)
+        self.blocked_until = 0.0
+
+    def block_until(self, deadline: float):
+        """Hold back every caller's next request until the monotonic deadline."""
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, deadline)
 
     def wait_if_needed(self):
-        now = time.time()
-        cutoff = now - self.window_seconds
-        self.timestamps = [t for t in self.timestamps if t > cutoff]
+        with self.lock:
+            now = time.monotonic()
+            if self.blocked_until > now:
+                time.sleep(self.blocked_until - now)
+                now = time.monotonic()
+
+            cutoff = now - self.window_seconds
+            while self.timestamps and self.timestamps[0] <= cutoff:
+                self.timestamps.popleft()
 
-        if len(self.timestamps) >= self.max_requests:
-            sleep_time = self.timestamps[0] - cutoff + 0.1
-            if sleep_time > 0:
-                print(f"  Rate limit: sleeping {sleep_time:.1f}s...")
-                time.sleep(sleep_time)
+            if len(self.timestamps) >= self.max_requests:
+                sleep_time = self.timestamps[0] - cutoff + 0.1
+                if sleep_time > 0:
+                    print(f"  Rate limit: sleeping {sleep_time:.1f}s...")
+                    time.sleep(sleep_time)
 
-        self.timestamps.append(time.time())
+            self.timestamps.append(time.monotonic())
 
 
 # ---------------------------------------------------------------------------
@@ -194,8 +275,24 @@ class RateLimiter:
 # ---------------------------------------------------------------------------
 
 def make_params_hash(endpoint: str, params: dict) -> str:
-    key = endpoint + "|" + json.dumps(params, sort_keys=True)
-    return hashlib.sha256(key.encode()).hexdigest()
+    # Existing cache rows are keyed on exactly this format, so the hash and
+    # serialization stay as they are. Per-match lookups have no params and
+    # skip json.dumps.
+    params_json = json.dumps(params, sort_keys=True) if params else "{}"
+    return _hash_cache_key(endpoint, params_json)
+
+
+@lru_cache(maxsize=16384)
+def _hash_cache_key(endpoint: str, params_json: str) -> str:
+    # The same key is hashed several times per sync step and again by reparse
+    return hashlib.sha256(f"{endpoint}|{params_json}".encode()).hexdigest()
+
+
+def decode_response_json(value: str | bytes):
+    """Parse a stored response_json value, compressed or not."""
+    if isinstance(value, bytes):
+        value = zlib.decompress(value)
+    return json.loads(value)
 
 
 def get_cached_response(conn: sqlite3.Connection, params_hash: str) -> dict | None:
@@ -204,22 +301,158 @@ def get_cached_response(conn: sqlite3.Connection, params_hash: str) -> dict | No
         (params_hash,),
     ).fetchone()
     if row:
-        return {"body": json.loads(row[0]), "status": row[1]}
+        return {"body": decode_response_json(row[0]), "status": row[1]}
     return None
 
 
+def cached_status(conn: sqlite3.Connection, params_hash: str) -> int | None:
+    """HTTP status of a cached response, or None if not cached. Never reads the body."""
+    row = conn.execute(
+        "SELECT http_status FROM api_responses WHERE params_hash = ?", (params_hash,)
+    ).fetchone()
+    return row[0] if row else None
+
+
 def store_response(conn: sqlite3.Connection, endpoint: str, params: dict,
                    params_hash: str, response_json: str, http_status: int):
+    # Season payloads are megabytes of repetitive JSON; compressed they take
+    # a fraction of the space and of the I/O when re-parsing
     conn.execute(
         """INSERT OR REPLACE INTO api_responses
-           (endpoint, params, params_hash, response_json, http_status, fetched_at)
-           VALUES (?, ?, ?, ?, ?, ?)""",
+           (endpoint, params, params_hash, response_json, http_status)
+           VALUES (?, ?, ?, ?, ?)""",
         (endpoint, json.dumps(params, sort_keys=True), params_hash,
-         response_json, http_status, datetime.utcnow().isoformat()),
+         zlib.compress(response_json.encode("utf-8")), http_status),
     )
+    # A fetched response costs rate-limited API quota, so it is committed
+    # right away. This is the sync loops' commit point: parsed rows and step
+    # marks from cached-only iterations ride along with the next fetch (or
+    # the commit at the end of the sync) instead of each paying for an fsync.
     conn.commit()
 
 
+# Idle HTTPS connections kept alive across requests, so each call after the
+# first skips the TCP and TLS handshakes. Holds at most one connection per
+# concurrent caller.
+_idle_connections: list[http.client.HTTPSConnection] = []
+_idle_connections_lock = threading.Lock()
+
+
+class StaleConnectionError(ConnectionError):
+    """A pooled keep-alive connection was dropped by the server while idle."""
+
+
+def http_get(path: str, api_key: str, fresh: bool = False) -> tuple[int, str]:
+    """
+    GET a path on the API host over a pooled connection. Returns (status, body).
+    Raises StaleConnectionError if a reused connection turns out to be dead;
+    pass fresh=True to retry on a new one.
+    """
+    connection = None
+    if not fresh:
+        with _idle_connections_lock:
+            connection = _idle_connections.pop() if _idle_connections else None
+    reused = connection is not None
+    if not reused:
+        connection = http.client.HTTPSConnection(API_HOST, timeout=30)
+
+    try:
+        connection.request("GET", path, headers={"X-Auth-Token": api_key})
+        resp = connection.getresponse()
+        result = resp.status, resp.read().decode("utf-8")
+    except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError) as e:
+        connection.close()
+        if reused:
+            raise StaleConnectionError(str(e)) from e
+        raise
+    except (http.client.HTTPException, OSError):
+        connection.close()
+        raise
+
+    with _idle_connections_lock:
+        _idle_connections.append(connection)
+    return result
+
+
+def close_connections():
+    with _idle_connections_lock:
+        for connection in _idle_connections:
+            connection.close()
+        _idle_connections.clear()
+
+
+def fetch_with_retry(endpoint: str, params: dict, api_key: str,
+                     rate_limiter: RateLimiter, max_retries: int = 3) -> tuple[int, str] | None:
+    """
+    Fetch from football-data.org with rate limiting and retry, bypassing the cache.
+    Returns (status, body), or None if every attempt failed. Does not touch
+    the database, so it is safe to call from worker threads.
+    """
+    # Built once, outside the retry loop. Per-match requests have no params
+    # and skip the encoding entirely.
+    path = f"{API_PATH_PREFIX}{endpoint}"
+    if params:
+        path = f"{path}?{urlencode(params)}"
+
+    for attempt in range(max_retries):
+        rate_limiter.wait_if_needed()
+
+        try:
+            try:
+                status, body = http_get(path, api_key)
+            except StaleConnectionError:
+                # The server dropped the idle connection (e.g. during a rate
+                # limit sleep). Retry at once on a new one, under its own
+                # limiter slot since the first request may have been counted.
+                rate_limiter.wait_if_needed()
+                status, body = http_get(path, api_key, fresh=True)
+        except (http.client.HTTPException, OSError) as e:
+            print(f"  Network error (attempt {attempt + 1}/{max_retries}): {e}")
+            time.sleep(10 * (attempt + 1))
+            continue
+
+        if status == 429:
+            wait = 65 * (attempt + 1)
+            print(f"  429 Too Many Requests. Waiting {wait}s (attempt {attempt + 1}/{max_retries})...")
+            # Pause every worker, not just this one, so the others don't keep
+            # spending quota (and retries) while the server is refusing
+            rate_limiter.block_until(time.monotonic() + wait)
+            continue
+
+        return status, body
+
+    print(f"  Failed after {max_retries} retries: {endpoint}")
+    return None
+
+
+def store_fetched_response(conn: sqlite3.Connection, endpoint: str, params: dict,
+                           params_hash: str, response: tuple[int, str] | None) -> dict | None:
+    """Cache a response from fetch_with_retry. Returns parsed JSON body or None on error."""
+    if response is None:
+        return None
+    status, body = response
+
+    if 300 <= status < 400:
+        # http.client does not follow redirects, and the API is not expected
+        # to send any. Not cached, so the next sync tries again.
+        print(f"  HTTP {status} redirect: {endpoint}")
+        return None
+
+    if status < 400:
+        store_response(conn, endpoint, params, params_hash, body, status)
+        return json.loads(body)
+
+    # Store non-retryable errors in cache so we don't re-fetch
+    store_response(conn, endpoint, params, params_hash, body or "{}", status)
+    if status == 404:
+        return None
+    if status == 403:
+        print(f"  403 Forbidden: {endpoint} (may not be available on free tier)")
+        return None
+    print(f"  HTTP {status}: {endpoint}")
+    return None
+
+
 def api_request(conn: sqlite3.Connection, endpoint: str, params: dict,
                 api_key: str, rate_limiter: RateLimiter, max_retries: int = 3) -> dict | None:
     """
@@ -235,56 +468,58 @@ def api_request(conn: sqlite3.Connection, endpoint: str, params: dict,
         # Non-200 cached responses (404, 403) - don't retry
         return None
 
-    url = f"{BASE_URL}{endpoint}"
-    if params:
-        query_string = "&".join(f"{k}={v}" for k, v in params.items())
-        url = f"{url}?{query_string}"
+    response = fetch_with_retry(endpoint, params, api_key, rate_limiter, max_retries)
+    return store_fetched_response(conn, endpoint, params, params_hash, response)
 
-    for attempt in range(max_retries):
-        rate_limiter.wait_if_needed()
 
-        try:
-            req = Request(url)
-            req.add_header("X-Auth-Token", api_key)
-            with urlopen(req, timeout=30) as resp:
-                body = resp.read().decode("utf-8")
-                store_response(conn, endpoint, params, params_hash, body, resp.status)
-                return json.loads(body)
-
-        except HTTPError as e:
-            body = ""
-            try:
-                body = e.read().decode("utf-8")
-            except Exception:
-                pass
-
-            if e.code == 429:
-                wait = 65 * (attempt + 1)
-                print(f"  429 Too Many Requests. Waiting {wait}s (attempt {attempt + 1}/{max_retries})...")
-                time.sleep(wait)
-                continue
+# ---------------------------------------------------------------------------
+# Parsers - extract structured data from raw API JSON
+# ---------------------------------------------------------------------------
 
-            # Store non-retryable errors in cache so we don't re-fetch
-            store_response(conn, endpoint, params, params_hash, body or "{}", e.code)
-            if e.code == 404:
-                return None
-            if e.code == 403:
-                print(f"  403 Forbidden: {endpoint} (may not be available on free tier)")
-                return None
-            print(f"  HTTP {e.code}: {endpoint}")
-            return None
-
-        except (URLError, TimeoutError) as e:
-            print(f"  Network error (attempt {attempt + 1}/{max_retries}): {e}")
-            time.sleep(10 * (attempt + 1))
+# Teams and persons recur in every squad and lineup response. Unlike
+# INSERT OR REPLACE (delete + insert, touching every index), these upserts
+# leave a row alone unless one of its values actually changed.
+TEAM_UPSERT_SQL = """
+    INSERT INTO teams (id, name, short_name, tla, crest_url, area_name)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT(id) DO UPDATE SET
+        name = excluded.name, short_name = excluded.short_name, tla = excluded.tla,
+        crest_url = excluded.crest_url, area_name = excluded.area_name
+    WHERE (teams.name, teams.short_name, teams.tla, teams.crest_url, teams.area_name)
+        IS NOT (excluded.name, excluded.short_name, excluded.tla,
+                excluded.crest_url, excluded.area_name)
+"""
 
-    print(f"  Failed after {max_retries} retries: {endpoint}")
-    return None
+PERSON_UPSERT_SQL = """
+    INSERT INTO persons (id, name, first_name, last_name, date_of_birth, nationality, position)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(id) DO UPDATE SET
+        name = excluded.name, first_name = excluded.first_name,
+        last_name = excluded.last_name, date_of_birth = excluded.date_of_birth,
+        nationality = excluded.nationality, position = excluded.position
+    WHERE (persons.name, persons.first_name, persons.last_name,
+           persons.date_of_birth, persons.nationality, persons.position)
+        IS NOT (excluded.name, excluded.first_name, excluded.last_name,
+                excluded.date_of_birth, excluded.nationality, excluded.position)
+"""
 
+TEAM_COMPETITION_INSERT_SQL = """
+    INSERT OR IGNORE INTO team_competitions (team_id, competition_id, season) VALUES (?, ?, ?)
+"""
+
+MATCH_UPSERT_SQL = """
+    INSERT OR REPLACE INTO matches
+    (id, competition_id, season, matchday, utc_date, home_team_id, away_team_id,
+     home_score, away_score, status)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+LINEUP_INSERT_SQL = """
+    INSERT OR IGNORE INTO match_lineups
+    (match_id, person_id, team_id, competition_id, season, lineup_type, shirt_number)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
 
-# ---------------------------------------------------------------------------
-# Parsers - extract structured data from raw API JSON
-# ---------------------------------------------------------------------------
 
 def parse_competition(conn: sqlite3.Connection, data: dict):
     comp = data.get("competition", data)
@@ -298,53 +533,68 @@ def parse_competition(conn: sqlite3.Connection, data: dict):
 
 
 def parse_teams(conn: sqlite3.Connection, data: dict, competition_id: int, season: int):
-    person_count = 0
+    team_rows = []
+    team_competition_rows = []
+    person_rows = []
+    collect_team_rows(data, competition_id, season, team_rows, team_competition_rows, person_rows)
+    write_team_rows(conn, team_rows, team_competition_rows, person_rows)
+    return len(person_rows)
+
+
+def collect_team_rows(data: dict, competition_id: int, season: int, team_rows: list,
+                      team_competition_rows: list, person_rows: list):
+    """Append the rows of a teams response to the given lists, for batching across responses."""
     for team in data.get("teams", []):
-        conn.execute(
-            """INSERT OR REPLACE INTO teams (id, name, short_name, tla, crest_url, area_name)
-               VALUES (?, ?, ?, ?, ?, ?)""",
+        team_rows.append(
             (team["id"], team.get("name"), team.get("shortName"),
-             team.get("tla"), team.get("crest"), team.get("area", {}).get("name")),
-        )
-        conn.execute(
-            "INSERT OR IGNORE INTO team_competitions (team_id, competition_id, season) VALUES (?, ?, ?)",
-            (team["id"], competition_id, season),
+             team.get("tla"), team.get("crest"), team.get("area", {}).get("name"))
         )
+        team_competition_rows.append((team["id"], competition_id, season))
         # Extract squad members as persons
         for player in team.get("squad", []):
             pid = player.get("id")
             if not pid:
                 continue
-            conn.execute(
-                """INSERT OR REPLACE INTO persons (id, name, first_name, last_name,
-                   date_of_birth, nationality, position)
-                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+            person_rows.append(
                 (pid, player.get("name"), None, None,
                  player.get("dateOfBirth"), player.get("nationality"),
-                 player.get("position")),
+                 player.get("position"))
             )
-            person_count += 1
-    return person_count
+
+
+def write_team_rows(conn: sqlite3.Connection, team_rows: list,
+                    team_competition_rows: list, person_rows: list):
+    conn.executemany(TEAM_UPSERT_SQL, team_rows)
+    conn.executemany(TEAM_COMPETITION_INSERT_SQL, team_competition_rows)
+    conn.executemany(PERSON_UPSERT_SQL, person_rows)
 
 
 def parse_matches(conn: sqlite3.Connection, data: dict, competition_id: int, season: int):
+    match_rows = []
     for match in data.get("matches", []):
         home_id = match.get("homeTeam", {}).get("id")
         away_id = match.get("awayTeam", {}).get("id")
         score = match.get("score", {})
         ft = score.get("fullTime", {})
-        conn.execute(
-            """INSERT OR REPLACE INTO matches
-               (id, competition_id, season, matchday, utc_date, home_team_id, away_team_id,
-                home_score, away_score, status)
-               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        match_rows.append(
             (match["id"], competition_id, season, match.get("matchday"),
              match.get("utcDate"), home_id, away_id,
-             ft.get("home"), ft.get("away"), match.get("status")),
+             ft.get("home"), ft.get("away"), match.get("status"))
         )
 
+    conn.executemany(MATCH_UPSERT_SQL, match_rows)
+
 
 def parse_lineups(conn: sqlite3.Connection, match_data: dict):
+    person_rows = []
+    lineup_rows = []
+    collect_lineup_rows(match_data, person_rows, lineup_rows)
+    conn.executemany(PERSON_UPSERT_SQL, person_rows)
+    conn.executemany(LINEUP_INSERT_SQL, lineup_rows)
+
+
+def collect_lineup_rows(match_data: dict, person_rows: list, lineup_rows: list):
+    """Append the rows of a match response to the given lists, for batching across matches."""
     match_id = match_data.get("id")
     comp_id = match_data.get("competition", {}).get("id")
     season_year = match_data.get("season", {}).get("startDate", "")[:4]
@@ -362,20 +612,14 @@ def parse_lineups(conn: sqlite3.Connection, match_data: dict):
                 pid = player.get("id")
                 if not pid:
                     continue
-                conn.execute(
-                    """INSERT OR REPLACE INTO persons (id, name, first_name, last_name,
-                       date_of_birth, nationality, position)
-                       VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                person_rows.append(
                     (pid, player.get("name"), None, None,
                      player.get("dateOfBirth"), player.get("nationality"),
-                     player.get("position")),
+                     player.get("position"))
                 )
-                conn.execute(
-                    """INSERT OR IGNORE INTO match_lineups
-                       (match_id, person_id, team_id, competition_id, season, lineup_type, shirt_number)
-                       VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                lineup_rows.append(
                     (match_id, pid, team_id, comp_id, season, lineup_type,
-                     player.get("shirtNumber")),
+                     player.get("shirtNumber"))
                 )
 
 
@@ -383,27 +627,19 @@ def parse_lineups(conn: sqlite3.Connection, match_data: dict):
 # Sync functions
 # ---------------------------------------------------------------------------
 
-def is_step_complete(conn: sqlite3.Connection, code: str, season: int, step: str) -> bool:
-    row = conn.execute(
-        "SELECT 1 FROM sync_status WHERE competition_code=? AND season=? AND step=?",
-        (code, season, step),
-    ).fetchone()
-    return row is not None
+def completed_steps(conn: sqlite3.Connection, step: str) -> set[tuple[str, int]]:
+    """All (competition_code, season) pairs already done for a step, in one query."""
+    rows = conn.execute(
+        "SELECT competition_code, season FROM sync_status WHERE step=?", (step,)
+    )
+    return {(code, season) for code, season in rows}
 
 
 def mark_step_complete(conn: sqlite3.Connection, code: str, season: int, step: str):
     conn.execute(
-        "INSERT OR IGNORE INTO sync_status (competition_code, season, step, completed_at) VALUES (?, ?, ?, ?)",
-        (code, season, step, datetime.utcnow().isoformat()),
+        "INSERT OR IGNORE INTO sync_status (competition_code, season, step) VALUES (?, ?, ?)",
+        (code, season, step),
     )
-    conn.commit()
-
-
-def _check_cached_403(conn: sqlite3.Connection, endpoint: str, params: dict) -> bool:
-    """Check if this endpoint+params is cached as a 403 (free tier limitation)."""
-    ph = make_params_hash(endpoint, params)
-    cached = get_cached_response(conn, ph)
-    return cached is not None and cached["status"] == 403
 
 
 def sync_teams(conn: sqlite3.Connection, api_key: str, rate_limiter: RateLimiter,
@@ -414,12 +650,13 @@ def sync_teams(conn: sqlite3.Connection, api_key: str, rate_limiter: RateLimiter
     total = len(competitions) * len(sorted_seasons)
     done = 0
     api_calls = 0
+    completed = completed_steps(conn, "teams")
 
     for code in competitions:
         consecutive_403s = 0
         for season in sorted_seasons:
             done += 1
-            if is_step_complete(conn, code, season, "teams"):
+            if (code, season) in completed:
                 continue
 
             # If we've hit 2 consecutive 403s going backward, skip remaining older seasons
@@ -430,10 +667,11 @@ def sync_teams(conn: sqlite3.Connection, api_key: str, rate_limiter: RateLimiter
             endpoint = f"/competitions/{code}/teams"
             params = {"season": str(season)}
             params_hash = make_params_hash(endpoint, params)
-            was_cached = get_cached_response(conn, params_hash) is not None
+            status = cached_status(conn, params_hash)
+            was_cached = status is not None
 
-            # Check if already cached as 403 before making a request
-            if _check_cached_403(conn, endpoint, params):
+            # Check if already cached as 403 (free tier limitation) before making a request
+            if status == 403:
                 mark_step_complete(conn, code, season, "teams")
                 consecutive_403s += 1
                 continue
@@ -448,7 +686,6 @@ def sync_teams(conn: sqlite3.Connection, api_key: str, rate_limiter: RateLimiter
                 comp_id = data.get("competition", {}).get("id")
                 if comp_id:
                     persons = parse_teams(conn, data, comp_id, season)
-                    conn.commit()
                 mark_step_complete(conn, code, season, "teams")
                 print(f"  [{done}/{total}] {code} {season}: {len(data['teams'])} teams, {persons} players")
             else:
@@ -457,24 +694,38 @@ def sync_teams(conn: sqlite3.Connection, api_key: str, rate_limiter: RateLimiter
                 if consecutive_403s == 2:
                     print(f"  [{done}/{total}] {code}: skipping older seasons (403 - free tier limit)")
 
+    conn.commit()
     print(f"  Teams sync complete. API calls: {api_calls}")
 
 
 def reparse_teams(conn: sqlite3.Connection):
     """Re-parse all cached team responses to extract squad/person data."""
+    # Stream the cached responses instead of loading them all, and write
+    # their rows in batches spanning many responses
     rows = conn.execute(
         "SELECT response_json FROM api_responses WHERE endpoint LIKE '%/teams' AND http_status = 200"
-    ).fetchall()
+    )
+    response_count = 0
     total_persons = 0
+    team_rows, team_competition_rows, person_rows = [], [], []
     for (raw,) in rows:
-        data = json.loads(raw)
+        response_count += 1
+        data = decode_response_json(raw)
         comp_id = data.get("competition", {}).get("id")
         season_info = data.get("season", {})
         season = int(season_info.get("startDate", "0")[:4]) if season_info.get("startDate") else None
         if comp_id and season:
-            total_persons += parse_teams(conn, data, comp_id, season)
+            collect_team_rows(data, comp_id, season, team_rows, team_competition_rows, person_rows)
+
+        if len(person_rows) >= REPARSE_BATCH_SIZE:
+            total_persons += len(person_rows)
+            write_team_rows(conn, team_rows, team_competition_rows, person_rows)
+            team_rows, team_competition_rows, person_rows = [], [], []
+
+    total_persons += len(person_rows)
+    write_team_rows(conn, team_rows, team_competition_rows, person_rows)
     conn.commit()
-    return len(rows), total_persons
+    return response_count, total_persons
 
 
 def sync_matches(conn: sqlite3.Connection, api_key: str, rate_limiter: RateLimiter,
@@ -484,12 +735,13 @@ def sync_matches(conn: sqlite3.Connection, api_key: str, rate_limiter: RateLimit
     total = len(competitions) * len(sorted_seasons)
     done = 0
     api_calls = 0
+    completed = completed_steps(conn, "matches")
 
     for code in competitions:
         consecutive_403s = 0
         for season in sorted_seasons:
             done += 1
-            if is_step_complete(conn, code, season, "matches"):
+            if (code, season) in completed:
                 continue
 
             if consecutive_403s >= 2:
@@ -499,9 +751,10 @@ def sync_matches(conn: sqlite3.Connection, api_key: str, rate_limiter: RateLimit
             endpoint = f"/competitions/{code}/matches"
             params = {"season": str(season)}
             params_hash = make_params_hash(endpoint, params)
-            was_cached = get_cached_response(conn, params_hash) is not None
+            status = cached_status(conn, params_hash)
+            was_cached = status is not None
 
-            if _check_cached_403(conn, endpoint, params):
+            if status == 403:
                 mark_step_complete(conn, code, season, "matches")
                 consecutive_403s += 1
                 continue
@@ -516,7 +769,6 @@ def sync_matches(conn: sqlite3.Connection, api_key: str, rate_limiter: RateLimit
                 comp_id = data.get("competition", {}).get("id")
                 if comp_id:
                     parse_matches(conn, data, comp_id, season)
-                    conn.commit()
                 match_count = len(data.get("matches", []))
                 mark_step_complete(conn, code, season, "matches")
                 print(f"  [{done}/{total}] {code} {season}: {match_count} matches")
@@ -526,6 +778,7 @@ def sync_matches(conn: sqlite3.Connection, api_key: str, rate_limiter: RateLimit
                 if consecutive_403s == 2:
                     print(f"  [{done}/{total}] {code}: skipping older seasons (403 - free tier limit)")
 
+    conn.commit()
     print(f"  Matches sync complete. API calls: {api_calls}")
 
 
@@ -553,62 +806,74 @@ def sync_lineups(conn: sqlite3.Connection, api_key: str, rate_limiter: RateLimit
         season_filter = f"AND m.season IN ({season_placeholders})"
         query_params.extend(seasons)
 
+    # Along with each match, its cached response status (NULL if never
+    # fetched), joined through idx_api_responses_endpoint
     rows = conn.execute(f"""
-        SELECT m.id FROM matches m
-        LEFT JOIN match_lineups ml ON m.id = ml.match_id
+        SELECT m.id, r.http_status FROM matches m
+        LEFT JOIN api_responses r ON r.endpoint = '/matches/' || m.id
         WHERE m.competition_id IN ({placeholders})
         {season_filter}
         AND m.status = 'FINISHED'
-        AND ml.id IS NULL
+        AND NOT EXISTS (SELECT 1 FROM match_lineups ml WHERE ml.match_id = m.id)
         ORDER BY m.id
     """, query_params).fetchall()
 
-    match_ids = [r[0] for r in rows]
-
     # Also exclude matches we already fetched but had no lineup data
     # (cached as non-200 or empty lineups)
-    already_attempted = set()
-    for mid in match_ids:
-        endpoint = f"/matches/{mid}"
-        ph = make_params_hash(endpoint, {})
-        if get_cached_response(conn, ph) is not None:
-            already_attempted.add(mid)
-
-    remaining = [mid for mid in match_ids if mid not in already_attempted]
-
-    # For already-attempted matches that are cached with 200, try parsing them
-    for mid in already_attempted:
-        endpoint = f"/matches/{mid}"
-        ph = make_params_hash(endpoint, {})
-        cached = get_cached_response(conn, ph)
-        if cached and cached["status"] == 200:
-            parse_lineups(conn, cached["body"])
+    remaining = [mid for mid, status in rows if status is None]
+    already_attempted = len(rows) - len(remaining)
+
+    # For already-attempted matches that are cached with 200, try parsing
+    # them, writing the rows of all replayed matches in a few large batches
+    person_rows, lineup_rows = [], []
+    for mid, status in rows:
+        if status == 200:
+            cached = get_cached_response(conn, make_params_hash(f"/matches/{mid}", {}))
+            if cached:
+                collect_lineup_rows(cached["body"], person_rows, lineup_rows)
+        if len(lineup_rows) >= REPARSE_BATCH_SIZE:
+            conn.executemany(PERSON_UPSERT_SQL, person_rows)
+            conn.executemany(LINEUP_INSERT_SQL, lineup_rows)
+            person_rows, lineup_rows = [], []
+    conn.executemany(PERSON_UPSERT_SQL, person_rows)
+    conn.executemany(LINEUP_INSERT_SQL, lineup_rows)
     conn.commit()
 
     total = len(remaining)
     if total == 0:
-        print(f"  No new matches to fetch lineups for. ({len(already_attempted)} already cached)")
+        print(f"  No new matches to fetch lineups for. ({already_attempted} already cached)")
         return
 
-    print(f"  {total} matches need lineup data ({len(already_attempted)} already cached)")
+    print(f"  {total} matches need lineup data ({already_attempted} already cached)")
     api_calls = 0
     lineups_found = 0
 
-    for i, match_id in enumerate(remaining, 1):
-        endpoint = f"/matches/{match_id}"
-        data = api_request(conn, endpoint, {}, api_key, rate_limiter)
-        api_calls += 1
-
-        if data:
-            home_lineup = data.get("homeTeam", {}).get("lineup", [])
-            away_lineup = data.get("awayTeam", {}).get("lineup", [])
-            if home_lineup or away_lineup:
-                parse_lineups(conn, data)
-                lineups_found += 1
-
-        if i % 10 == 0:
-            conn.commit()
-            print(f"  [{i}/{total}] Fetched {api_calls} matches, {lineups_found} with lineups")
+    # Workers only do the HTTP round trips; responses come back in order and
+    # are cached and parsed here, since the sqlite connection is not shared
+    # across threads. None of the remaining matches are cached yet.
+    def fetch_match(match_id: int) -> tuple[int, str] | None:
+        return fetch_with_retry(f"/matches/{match_id}", {}, api_key, rate_limiter)
+
+    pool = ThreadPoolExecutor(max_workers=LINEUP_FETCH_WORKERS)
+    try:
+        responses = pool.map(fetch_match, remaining)
+        for i, (match_id, response) in enumerate(zip(remaining, responses), 1):
+            endpoint = f"/matches/{match_id}"
+            data = store_fetched_response(conn, endpoint, {}, make_params_hash(endpoint, {}), response)
+            api_calls += 1
+
+            if data:
+                home_lineup = data.get("homeTeam", {}).get("lineup", [])
+                away_lineup = data.get("awayTeam", {}).get("lineup", [])
+                if home_lineup or away_lineup:
+                    parse_lineups(conn, data)
+                    lineups_found += 1
+
+            if i % 10 == 0:
+                print(f"  [{i}/{total}] Fetched {api_calls} matches, {lineups_found} with lineups")
+    finally:
+        # Don't keep fetching queued matches after an error or Ctrl-C
+        pool.shutdown(cancel_futures=True)
 
     conn.commit()
     print(f"  Lineups sync complete. API calls: {api_calls}, matches with lineups: {lineups_found}")
@@ -730,7 +995,7 @@ def main():
 
     if args.command == "stats":
         print_stats(conn)
-        conn.close()
+        close_db(conn)
         return
 
     if args.command == "reparse":
@@ -738,7 +1003,7 @@ def main():
         responses, persons = reparse_teams(conn)
         print(f"  Re-parsed {responses} team responses, found {persons} player entries")
         print_stats(conn)
-        conn.close()
+        close_db(conn)
         return
 
     api_key = resolve_api_key(args.api_key)
@@ -764,7 +1029,8 @@ def main():
     }
 
     dispatch[args.command](conn, api_key, rate_limiter, competitions, seasons)
-    conn.close()
+    close_connections()
+    close_db(conn)
     print("\nDone.")
 
 
@@ -8,12 +8,16 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from app.models.database import get_db_connection, init_database, DATABASE_PATH
 from extract_wikidata import (
+    get_import_connection,
     run_sparql_query,
     normalize_name,
+    is_national_team_name,
     extract_first_last_name,
-    insert_player,
-    insert_club,
-    insert_player_club
+    binding_date,
+    insert_players_bulk,
+    insert_clubs_bulk,
+    lookup_ids_by_wikidata_id,
+    insert_player_clubs,
 )
 
 
@@ -23,7 +27,7 @@ def fetch_sample_players():
     print("Fetching sample Premier League players...")
 
     query = """
-    SELECT DISTINCT ?player ?playerLabel ?nationalityLabel ?positionLabel ?birthDate ?wikidataId
+    SELECT DISTINCT ?playerLabel ?nationalityLabel ?positionLabel ?birthDate ?wikidataId
     WHERE {
       BIND(REPLACE(STR(?player), "http://www.wikidata.org/entity/", "") AS ?wikidataId)
 
@@ -59,7 +63,7 @@ def fetch_sample_players():
             "name": name,
             "nationality": result.get("nationalityLabel", {}).get("value"),
             "position": result.get("positionLabel", {}).get("value"),
-            "birth_date": result.get("birthDate", {}).get("value", "")[:10] if result.get("birthDate") else None,
+            "birth_date": binding_date(result, "birthDate"),
             "gender": "male",
         }
 
@@ -94,9 +98,9 @@ def fetch_player_clubs(wikidata_id: str):
         clubs.append({
             "wikidata_id": club_id,
             "name": club_name,
-            "start_date": result.get("startTime", {}).get("value", "")[:10] if result.get("startTime") else None,
-            "end_date": result.get("endTime", {}).get("value", "")[:10] if result.get("endTime") else None,
-            "is_national_team": "national" in club_name.lower(),
+            "start_date": binding_date(result, "startTime"),
+            "end_date": binding_date(result, "endTime"),
+            "is_national_team": is_national_team_name(club_name),
         })
 
     return clubs
@@ -109,23 +113,37 @@ def main():
 
     # Initialize database
     init_database()
-    conn = get_db_connection()
+    conn = get_import_connection()
 
     # Fetch sample players
     players = fetch_sample_players()
     print(f"\nProcessing {len(players)} unique players...")
 
     # Insert players and their club histories
-    for i, player in enumerate(players[:20]):  # Just do 20 for the test
-        player_id = insert_player(conn, player)
+    players = players[:20]  # Just do 20 for the test
+    insert_players_bulk(conn, players)
+    # Look up IDs for both new and pre-existing players
+    player_ids = lookup_ids_by_wikidata_id(conn, "players", [player["wikidata_id"] for player in players])
+    conn.commit()
+
+    for i, player in enumerate(players):
+        player_id = player_ids.get(player["wikidata_id"])
 
         if player_id:
             # Fetch and insert club history
             clubs = fetch_player_clubs(player["wikidata_id"])
-            for club in clubs:
-                club_id = insert_club(conn, club)
-                if club_id:
-                    insert_player_club(conn, player_id, club_id, club)
+            club_ids = insert_clubs_bulk(conn, clubs)
+            insert_player_clubs(conn, [
+                (
+                    player_id,
+                    club_ids[club["wikidata_id"]],
+                    club["start_date"],
+                    club["end_date"],
+                    club["is_national_team"],
+                )
+                for club in clubs
+                if club["wikidata_id"] in club_ids
+            ])
 
             print(f"  {i+1}. {player['name']} - {len(clubs)} clubs")
 
@@ -138,6 +156,8 @@ def main():
     print("Verification")
     print("=" * 50)
 
+    # A plain read connection: get_db_connection already memory-maps the
+    # database (mmap_size=256 MB), which is what the join below wants
     conn = get_db_connection()
     cursor = conn.cursor()
 
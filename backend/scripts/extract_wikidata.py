@@ -10,9 +10,9 @@ Run this script periodically to refresh the database.
 
 import requests
 import sqlite3
-import unicodedata
 import re
 import time
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional
 import sys
@@ -20,9 +20,16 @@ import sys
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 from app.models.database import get_db_connection, init_database, DATABASE_PATH
+# Shared with the API so imported names normalize exactly like lookups do
+from app.services.fuzzy_matching import normalize_name as _normalize_name
 
 WIKIDATA_ENDPOINT = "https://query.wikidata.org/sparql"
 
+# The same club names come back for thousands of players, so memoize
+normalize_name = lru_cache(maxsize=100_000)(_normalize_name)
+
+_ISO_DATE_RE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
 
 def parse_wikidata_date(value: Optional[str]) -> Optional[str]:
     """
@@ -34,15 +41,30 @@ def parse_wikidata_date(value: Optional[str]) -> Optional[str]:
         return None
     # Take first 10 chars (handles full ISO timestamps like '2020-01-15T00:00:00Z')
     candidate = value[:10]
-    if re.match(r'^\d{4}-\d{2}-\d{2}$', candidate):
+    if _ISO_DATE_RE.match(candidate):
         return candidate
     return None
 
+
+def binding_date(result: dict, key: str) -> Optional[str]:
+    """
+    Parse the date bound to key in a SPARQL result row, or None if unbound.
+    """
+    binding = result.get(key)
+    return parse_wikidata_date(binding.get("value")) if binding else None
+
+
 HEADERS = {
     "Accept": "application/sparql-results+json",
     "User-Agent": "SoccerPlayerApp/1.0 (personal project for naming 1000 soccer players)"
 }
 
+# Shared by all queries (including concurrent ones) so connections to the
+# endpoint are pooled and reused instead of re-handshaking TLS every time
+_SESSION = requests.Session()
+_SESSION.headers.update(HEADERS)
+_SESSION.mount("https://", requests.adapters.HTTPAdapter(pool_connections=8, pool_maxsize=8))
+
 # Men's league Wikidata IDs
 MENS_LEAGUES = {
     "Premier League": "Q9448",
@@ -52,21 +74,76 @@ MENS_LEAGUES = {
     "Ligue 1": "Q13394",
 }
 
+# Rows written per explicit transaction during bulk imports. Each COMMIT
+# costs an fsync, so this amortizes it over thousands of inserts.
+INSERT_BATCH_SIZE = 5000
+
+# SQLite caps a statement at 999 bound parameters, so multi-row INSERTs and
+# IN (...) lookups are split into chunks that stay under it.
+SQLITE_MAX_PARAMS = 999
+PLAYER_COLUMNS = 9
+PLAYER_ROWS_PER_INSERT = SQLITE_MAX_PARAMS // PLAYER_COLUMNS
+CLUB_ROWS_PER_INSERT = SQLITE_MAX_PARAMS // 3
+
+# Non-unique indexes on players, dropped during the bulk insert and rebuilt
+# once afterwards, even if the insert fails.
+# The UNIQUE wikidata_id index stays since INSERT OR IGNORE relies on it.
+PLAYER_SECONDARY_INDEXES = {
+    "idx_players_normalized_name": "players(normalized_name)",
+    "idx_players_name": "players(name)",
+}
+
+# Keeps an existing club untouched but still returns its id, so inserting a
+# club costs one statement whether or not it is new. The no-op assignment is
+# on a column with no index. Players don't use this: their AFTER UPDATE
+# trigger would rewrite the FTS entry of every existing player.
+CLUB_UPSERT_RETURNING_SQL = """
+    ON CONFLICT(wikidata_id) DO UPDATE SET normalized_name = normalized_name
+    RETURNING id, wikidata_id
+"""
+
+# Followed by one "(?, ...)" group per row
+PLAYER_INSERT_SQL = """
+    INSERT OR IGNORE INTO players
+    (wikidata_id, name, normalized_name, first_name, last_name,
+     nationality, position, birth_date, gender)
+    VALUES
+"""
+
+CLUB_INSERT_SQL = """
+    INSERT INTO clubs (wikidata_id, name, normalized_name)
+    VALUES
+"""
 
-def normalize_name(name: str) -> str:
+PLAYER_CLUB_INSERT_SQL = """
+    INSERT OR IGNORE INTO player_clubs
+    (player_id, club_id, start_date, end_date, is_national_team)
+    VALUES (?, ?, ?, ?, ?)
+"""
+
+
+@lru_cache(maxsize=None)
+def is_national_team_name(club_name: str) -> bool:
+    """
+    Name-based national team check, for teams Wikidata doesn't flag as
+    national association football teams (e.g. youth and B national sides).
+    Cached since the same club names recur across thousands of rows.
+    """
+    return "national" in club_name.lower()
+
+
+def get_import_connection() -> sqlite3.Connection:
     """
-    Normalize a name for matching:
-    - Convert to lowercase
-    - Remove accents/diacritics
-    - Remove extra whitespace
+    Open a database connection tuned for bulk imports.
     """
-    # Normalize unicode and remove accents
-    normalized = unicodedata.normalize('NFKD', name)
-    normalized = ''.join(c for c in normalized if not unicodedata.combining(c))
-    # Lowercase and clean whitespace
-    normalized = normalized.lower().strip()
-    normalized = re.sub(r'\s+', ' ', normalized)
-    return normalized
+    conn = get_db_connection()
+    conn.execute("PRAGMA journal_mode=WAL")
+    # NORMAL sync is crash-safe under WAL (only the last commits can be lost
+    # on power failure) and skips the fsync on every commit
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-262144")
+    return conn
 
 
 def extract_first_last_name(full_name: str) -> tuple[Optional[str], Optional[str]]:
@@ -74,7 +151,7 @@ def extract_first_last_name(full_name: str) -> tuple[Optional[str], Optional[str
     Attempt to extract first and last name from a full name.
     This is a simple heuristic - assumes "First Last" format.
     """
-    parts = full_name.strip().split()
+    parts = full_name.split()  # split() already drops surrounding whitespace
     if len(parts) >= 2:
         return parts[0], ' '.join(parts[1:])
     elif len(parts) == 1:
@@ -82,31 +159,50 @@ def extract_first_last_name(full_name: str) -> tuple[Optional[str], Optional[str
     return None, None
 
 
-def run_sparql_query(query: str, max_retries: int = 3) -> list[dict]:
+class SparqlTimeout(Exception):
+    """Wikidata gave up on a query (server-side limit or client timeout)."""
+
+
+def _is_query_timeout(response: requests.Response) -> bool:
+    # Wikidata reports its query time limit as a 500 with a Java stack trace
+    return response.status_code == 504 or (
+        response.status_code == 500 and "TimeoutException" in response.text
+    )
+
+
+def run_sparql_query(query: str, max_retries: int = 3, raise_on_timeout: bool = False) -> list[dict]:
     """
     Run a SPARQL query against Wikidata with retry logic.
+
+    With raise_on_timeout, a timed out query raises SparqlTimeout right away
+    instead of being retried, so the caller can split it into smaller ones.
     """
     for attempt in range(max_retries):
         try:
-            response = requests.get(
+            response = _SESSION.get(
                 WIKIDATA_ENDPOINT,
                 params={"query": query},
-                headers=HEADERS,
                 timeout=120
             )
 
             if response.status_code == 200:
                 data = response.json()
                 return data["results"]["bindings"]
-            elif response.status_code == 429:  # Rate limited
-                wait_time = 60 * (attempt + 1)
+            elif response.status_code == 429:  # Rate limited, back off exponentially
+                wait_time = 60 * 2 ** attempt
                 print(f"Rate limited. Waiting {wait_time}s...")
                 time.sleep(wait_time)
+            elif raise_on_timeout and _is_query_timeout(response):
+                raise SparqlTimeout(f"HTTP {response.status_code}")
             else:
                 print(f"Error {response.status_code}: {response.text[:200]}")
                 time.sleep(10)
 
-        except requests.exceptions.Timeout:
+        except SparqlTimeout:
+            raise
+        except requests.exceptions.Timeout as e:
+            if raise_on_timeout:
+                raise SparqlTimeout(str(e)) from e
             print(f"Timeout on attempt {attempt + 1}")
             time.sleep(30)
         except Exception as e:
@@ -124,7 +220,7 @@ def fetch_mens_league_players(league_name: str, league_id: str, min_year: int =
 
     # Query players with their basic info
     query = f"""
-    SELECT DISTINCT ?player ?playerLabel ?nationalityLabel ?positionLabel ?birthDate ?wikidataId
+    SELECT DISTINCT ?playerLabel ?nationalityLabel ?positionLabel ?birthDate ?wikidataId
     WHERE {{
       # Get the Wikidata ID
       BIND(REPLACE(STR(?player), "http://www.wikidata.org/entity/", "") AS ?wikidataId)
@@ -167,7 +263,7 @@ def fetch_mens_league_players(league_name: str, league_id: str, min_year: int =
                 "name": name,
                 "nationality": result.get("nationalityLabel", {}).get("value"),
                 "position": result.get("positionLabel", {}).get("value"),
-                "birth_date": parse_wikidata_date(result.get("birthDate", {}).get("value")) if result.get("birthDate") else None,
+                "birth_date": binding_date(result, "birthDate"),
                 "gender": "male",
                 "league": league_name,
             }
@@ -183,7 +279,7 @@ def fetch_womens_players(limit: int = 10000) -> list[dict]:
     print(f"\nFetching women's football players...")
 
     query = f"""
-    SELECT DISTINCT ?player ?playerLabel ?nationalityLabel ?positionLabel ?birthDate ?wikidataId
+    SELECT DISTINCT ?playerLabel ?nationalityLabel ?positionLabel ?birthDate ?wikidataId
     WHERE {{
       BIND(REPLACE(STR(?player), "http://www.wikidata.org/entity/", "") AS ?wikidataId)
 
@@ -221,7 +317,7 @@ def fetch_womens_players(limit: int = 10000) -> list[dict]:
                 "name": name,
                 "nationality": result.get("nationalityLabel", {}).get("value"),
                 "position": result.get("positionLabel", {}).get("value"),
-                "birth_date": parse_wikidata_date(result.get("birthDate", {}).get("value")) if result.get("birthDate") else None,
+                "birth_date": binding_date(result, "birthDate"),
                 "gender": "female",
                 "league": "Women's Football",
             }
@@ -267,100 +363,118 @@ def fetch_player_club_history(wikidata_id: str) -> list[dict]:
         clubs.append({
             "wikidata_id": result.get("clubId", {}).get("value"),
             "name": club_name,
-            "start_date": parse_wikidata_date(result.get("startTime", {}).get("value")) if result.get("startTime") else None,
-            "end_date": parse_wikidata_date(result.get("endTime", {}).get("value")) if result.get("endTime") else None,
+            "start_date": binding_date(result, "startTime"),
+            "end_date": binding_date(result, "endTime"),
             "is_national_team": result.get("isNationalTeam", {}).get("value") == "true",
         })
 
     return clubs
 
 
-def insert_player(conn: sqlite3.Connection, player: dict) -> Optional[int]:
+def insert_players_bulk(conn: sqlite3.Connection, players: list[dict]):
     """
-    Insert a player into the database. Returns the player ID.
+    Insert many players using multi-row INSERTs. Players already in the
+    database are left as they are; use lookup_ids_by_wikidata_id for the IDs.
     """
-    cursor = conn.cursor()
-
-    first_name, last_name = extract_first_last_name(player["name"])
-    normalized = normalize_name(player["name"])
-
-    try:
-        cursor.execute("""
-            INSERT OR IGNORE INTO players
-            (wikidata_id, name, normalized_name, first_name, last_name,
-             nationality, position, birth_date, gender)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
+    rows = [
+        (
             player["wikidata_id"],
             player["name"],
-            normalized,
-            first_name,
-            last_name,
+            normalize_name(player["name"]),
+            *extract_first_last_name(player["name"]),
             player.get("nationality"),
             player.get("position"),
             player.get("birth_date"),
             player.get("gender", "male"),
-        ))
-
-        if cursor.rowcount > 0:
-            return cursor.lastrowid
-
-        # If insert was ignored (duplicate), get the existing ID
-        cursor.execute("SELECT id FROM players WHERE wikidata_id = ?", (player["wikidata_id"],))
-        row = cursor.fetchone()
-        return row[0] if row else None
+        )
+        for player in players
+    ]
 
-    except Exception as e:
-        print(f"Error inserting player {player['name']}: {e}")
-        return None
+    row_placeholder = "(" + ", ".join(["?"] * PLAYER_COLUMNS) + ")"
+    for start in range(0, len(rows), PLAYER_ROWS_PER_INSERT):
+        chunk = rows[start:start + PLAYER_ROWS_PER_INSERT]
+        try:
+            conn.execute(
+                PLAYER_INSERT_SQL + ", ".join([row_placeholder] * len(chunk)),
+                [value for row in chunk for value in row],
+            )
+        except Exception:
+            # A failed statement inserts nothing, so retry the chunk row by
+            # row: a bad row then costs only itself
+            for row in chunk:
+                try:
+                    conn.execute(PLAYER_INSERT_SQL + row_placeholder, row)
+                except Exception as e:
+                    print(f"Error inserting player {row[0]} ({row[1]}): {e}")
 
 
-def insert_club(conn: sqlite3.Connection, club: dict) -> Optional[int]:
+def insert_clubs_bulk(conn: sqlite3.Connection, clubs: list[dict]) -> dict[str, int]:
     """
-    Insert a club into the database. Returns the club ID.
+    Insert many clubs using multi-row INSERTs. Clubs are deduplicated by
+    wikidata_id (first occurrence wins, as with one-by-one inserts).
+    Returns a dict mapping wikidata_id -> club ID.
     """
-    cursor = conn.cursor()
-
-    normalized = normalize_name(club["name"])
-
-    try:
-        cursor.execute("""
-            INSERT OR IGNORE INTO clubs (wikidata_id, name, normalized_name)
-            VALUES (?, ?, ?)
-        """, (club["wikidata_id"], club["name"], normalized))
-
-        if cursor.rowcount > 0:
-            return cursor.lastrowid
-
-        cursor.execute("SELECT id FROM clubs WHERE wikidata_id = ?", (club["wikidata_id"],))
-        row = cursor.fetchone()
-        return row[0] if row else None
-
-    except Exception as e:
-        print(f"Error inserting club {club['name']}: {e}")
-        return None
+    unique_clubs = {}
+    for club in clubs:
+        unique_clubs.setdefault(club["wikidata_id"], club)
+    rows = [
+        (wikidata_id, club["name"], normalize_name(club["name"]))
+        for wikidata_id, club in unique_clubs.items()
+    ]
+
+    club_ids = {}
+    for start in range(0, len(rows), CLUB_ROWS_PER_INSERT):
+        chunk = rows[start:start + CLUB_ROWS_PER_INSERT]
+        try:
+            club_ids.update(
+                (wikidata_id, club_id)
+                for club_id, wikidata_id in conn.execute(
+                    CLUB_INSERT_SQL + ", ".join(["(?, ?, ?)"] * len(chunk)) + CLUB_UPSERT_RETURNING_SQL,
+                    [value for row in chunk for value in row],
+                ).fetchall()
+            )
+        except Exception:
+            # As with players: one bad row should cost only itself
+            for row in chunk:
+                try:
+                    club_ids.update(
+                        (wikidata_id, club_id)
+                        for club_id, wikidata_id in conn.execute(
+                            CLUB_INSERT_SQL + "(?, ?, ?)" + CLUB_UPSERT_RETURNING_SQL, row
+                        ).fetchall()
+                    )
+                except Exception as e:
+                    print(f"Error inserting club {row[0]} ({row[1]}): {e}")
+
+    return club_ids
+
+
+def lookup_ids_by_wikidata_id(conn: sqlite3.Connection, table: str, wikidata_ids: list[str]) -> dict[str, int]:
+    """
+    Map wikidata_id -> row ID for the given rows of players or clubs.
+    """
+    ids = {}
+    for start in range(0, len(wikidata_ids), SQLITE_MAX_PARAMS):
+        chunk = wikidata_ids[start:start + SQLITE_MAX_PARAMS]
+        ids.update(
+            (wikidata_id, row_id)
+            for row_id, wikidata_id in conn.execute(
+                f"SELECT id, wikidata_id FROM {table} WHERE wikidata_id IN ({','.join('?' * len(chunk))})",
+                chunk,
+            )
+        )
+    return ids
 
 
-def insert_player_club(conn: sqlite3.Connection, player_id: int, club_id: int, club_data: dict):
+def insert_player_clubs(conn: sqlite3.Connection, rows: list[tuple]):
     """
-    Insert a player-club relationship.
+    Insert player-club relationships, given as
+    (player_id, club_id, start_date, end_date, is_national_team) tuples.
     """
-    cursor = conn.cursor()
-
     try:
-        cursor.execute("""
-            INSERT OR IGNORE INTO player_clubs
-            (player_id, club_id, start_date, end_date, is_national_team)
-            VALUES (?, ?, ?, ?, ?)
-        """, (
-            player_id,
-            club_id,
-            club_data.get("start_date"),
-            club_data.get("end_date"),
-            club_data.get("is_national_team", False),
-        ))
+        conn.executemany(PLAYER_CLUB_INSERT_SQL, rows)
     except Exception as e:
-        print(f"Error inserting player-club relationship: {e}")
+        print(f"Error inserting player-club relationships: {e}")
 
 
 def main(fetch_clubs: bool = True):
@@ -376,7 +490,7 @@ def main(fetch_clubs: bool = True):
 
     # Initialize database
     init_database()
-    conn = get_db_connection()
+    conn = get_import_connection()
 
     all_players = []
 
@@ -390,22 +504,38 @@ def main(fetch_clubs: bool = True):
     women_players = fetch_womens_players(limit=15000)
     all_players.extend(women_players)
 
+    # Players who appeared in several leagues were fetched once per league.
+    # Keep the first copy, which is the one INSERT OR IGNORE would keep.
+    unique_players = {}
+    for player in all_players:
+        unique_players.setdefault(player["wikidata_id"], player)
+    all_players = list(unique_players.values())
+
     print(f"\n{'=' * 60}")
     print(f"Total players to process: {len(all_players)}")
     print("=" * 60)
 
-    # Insert players
-    processed = 0
-    for player in all_players:
-        insert_player(conn, player)
-
-        processed += 1
-        if processed % 1000 == 0:
-            conn.commit()
-            print(f"  Processed {processed}/{len(all_players)} players...")
+    # Insert players. Manage the transaction explicitly so SQLite doesn't
+    # wrap each statement in its own implicit one.
+    conn.isolation_level = None
+    for index_name in PLAYER_SECONDARY_INDEXES:
+        conn.execute(f"DROP INDEX IF EXISTS {index_name}")
 
-    conn.commit()
-    conn.close()
+    try:
+        for start in range(0, len(all_players), INSERT_BATCH_SIZE):
+            batch = all_players[start:start + INSERT_BATCH_SIZE]
+            conn.execute("BEGIN")
+            insert_players_bulk(conn, batch)
+            conn.execute("COMMIT")
+            print(f"  Processed {start + len(batch)}/{len(all_players)} players...")
+    finally:
+        # Lookups fall back to full scans without these, so put them back
+        # even if the insert fails partway
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        for index_name, columns in PLAYER_SECONDARY_INDEXES.items():
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {columns}")
+        conn.close()
 
     print(f"\n{'=' * 60}")
     print(f"Player extraction complete!")
@@ -9,23 +9,31 @@ Run this after extract_wikidata.py to populate club histories.
 
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from app.models.database import get_db_connection, DATABASE_PATH
+from app.models.database import DATABASE_PATH
 from extract_wikidata import (
+    get_import_connection,
     run_sparql_query,
-    insert_club,
-    insert_player_club,
+    SparqlTimeout,
+    insert_clubs_bulk,
+    insert_player_clubs,
     normalize_name,
-    parse_wikidata_date,
+    is_national_team_name,
+    binding_date,
 )
 
+# Concurrent SPARQL queries. Wikidata allows up to 5 in flight per client.
+SPARQL_WORKERS = 4
+
 
 def fetch_club_histories_batch(wikidata_ids: list[str]) -> dict[str, list[dict]]:
     """
     Fetch club histories for multiple players in a single SPARQL query.
+    If Wikidata times out, the batch is split in half and retried.
     Returns a dict mapping wikidata_id -> list of clubs.
     """
     if not wikidata_ids:
@@ -35,7 +43,7 @@ def fetch_club_histories_batch(wikidata_ids: list[str]) -> dict[str, list[dict]]
     values_clause = " ".join(f"wd:{wid}" for wid in wikidata_ids)
 
     query = f"""
-    SELECT ?player ?playerId ?clubLabel ?clubId ?startTime ?endTime ?isNationalTeam
+    SELECT ?playerId ?clubLabel ?clubId ?startTime ?endTime ?isNationalTeam
     WHERE {{
       VALUES ?player {{ {values_clause} }}
 
@@ -60,7 +68,14 @@ def fetch_club_histories_batch(wikidata_ids: list[str]) -> dict[str, list[dict]]
     ORDER BY ?playerId ?startTime
     """
 
-    results = run_sparql_query(query)
+    try:
+        results = run_sparql_query(query, raise_on_timeout=len(wikidata_ids) > 1)
+    except SparqlTimeout:
+        half = len(wikidata_ids) // 2
+        print(f"  Query for {len(wikidata_ids)} players timed out, retrying as two of {half}...")
+        player_clubs = fetch_club_histories_batch(wikidata_ids[:half])
+        player_clubs.update(fetch_club_histories_batch(wikidata_ids[half:]))
+        return player_clubs
 
     # Group results by player
     player_clubs = {}
@@ -81,48 +96,88 @@ def fetch_club_histories_batch(wikidata_ids: list[str]) -> dict[str, list[dict]]
         player_clubs[player_id].append({
             "wikidata_id": club_id,
             "name": club_name,
-            "start_date": parse_wikidata_date(result.get("startTime", {}).get("value")) if result.get("startTime") else None,
-            "end_date": parse_wikidata_date(result.get("endTime", {}).get("value")) if result.get("endTime") else None,
-            "is_national_team": "national" in club_name.lower() or result.get("isNationalTeam", {}).get("value") == "true",
+            "start_date": binding_date(result, "startTime"),
+            "end_date": binding_date(result, "endTime"),
+            "is_national_team": result.get("isNationalTeam", {}).get("value") == "true" or is_national_team_name(club_name),
         })
 
     return player_clubs
 
 
-def get_players_without_clubs(conn, limit: int = 1000) -> list[tuple[int, str]]:
+def get_players_without_clubs(conn) -> list[tuple[int, str]]:
     """
     Get players who don't have any club history yet.
-    Returns list of (player_id, wikidata_id) tuples.
+    Returns list of (player_id, wikidata_id) tuples, ordered by ID.
 
-    Note: Players are ordered by ID to ensure consistent batching.
+    Reads player_clubs and players once each and filters in Python, rather
+    than running a LEFT JOIN for every batch.
     If a batch fails, the same players will be retried on the next run.
     """
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT p.id, p.wikidata_id
-        FROM players p
-        LEFT JOIN player_clubs pc ON p.id = pc.player_id
-        WHERE pc.id IS NULL
-        ORDER BY p.id
-        LIMIT ?
-    """, (limit,))
-    return cursor.fetchall()
-
-
-def mark_player_no_clubs(conn, player_id: int):
+    processed = {row[0] for row in conn.execute("SELECT DISTINCT player_id FROM player_clubs")}
+    return [
+        (player_id, wikidata_id)
+        for player_id, wikidata_id in conn.execute("SELECT id, wikidata_id FROM players ORDER BY id")
+        if player_id not in processed
+    ]
+
+
+def store_club_histories(
+    conn,
+    player_ids: dict[str, int],
+    wikidata_ids: list[str],
+    club_histories: dict[str, list[dict]],
+    club_ids: dict[str, int],
+) -> tuple[int, int]:
     """
-    Insert a placeholder record to mark a player as having no clubs in Wikidata.
-    Uses club_id = 0 as a sentinel value.
+    Store the club histories fetched for one batch of players in a single
+    transaction. Players with no clubs in Wikidata get a placeholder row.
+
+    club_ids caches wikidata_id -> club ID across batches; only clubs missing
+    from it are written, and it is updated with their new IDs.
+    Returns (club relationships added, players marked as having no clubs).
     """
-    cursor = conn.cursor()
-    try:
-        cursor.execute("""
-            INSERT OR IGNORE INTO player_clubs
-            (player_id, club_id, start_date, end_date, is_national_team)
-            VALUES (?, 0, NULL, NULL, 0)
-        """, (player_id,))
-    except Exception as e:
-        print(f"Error marking player {player_id} as no clubs: {e}")
+    # Insert the batch's new clubs in bulk, then all relationships in one call
+    conn.execute("BEGIN")
+    club_ids.update(insert_clubs_bulk(conn, [
+        club
+        for wikidata_id, clubs in club_histories.items()
+        if player_ids.get(wikidata_id)
+        for club in clubs
+        if club["wikidata_id"] not in club_ids
+    ]))
+
+    player_club_rows = []
+    for wikidata_id, clubs in club_histories.items():
+        player_db_id = player_ids.get(wikidata_id)
+        if not player_db_id:
+            continue
+
+        for club in clubs:
+            club_db_id = club_ids.get(club["wikidata_id"])
+            if club_db_id:
+                player_club_rows.append((
+                    player_db_id,
+                    club_db_id,
+                    club["start_date"],
+                    club["end_date"],
+                    club["is_national_team"],
+                ))
+
+    clubs_added = len(player_club_rows)
+
+    # For players with no clubs found, insert a placeholder to mark them as processed
+    # (so they don't get queried again). Uses club_id = 0 as a sentinel value.
+    players_without_clubs = 0
+    for wikidata_id in wikidata_ids:
+        if wikidata_id not in club_histories:
+            player_db_id = player_ids.get(wikidata_id)
+            if player_db_id:
+                player_club_rows.append((player_db_id, 0, None, None, 0))
+                players_without_clubs += 1
+
+    insert_player_clubs(conn, player_club_rows)
+    conn.execute("COMMIT")
+    return clubs_added, players_without_clubs
 
 
 def main():
@@ -133,17 +188,13 @@ def main():
     print("Fetching Club Histories from Wikidata")
     print("=" * 60)
 
-    conn = get_db_connection()
+    conn = get_import_connection()
+    # Manual transaction control: one BEGIN/COMMIT per batch instead of an
+    # implicit transaction per statement.
+    conn.isolation_level = None
 
-    # Get count of players without clubs
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT COUNT(*)
-        FROM players p
-        LEFT JOIN player_clubs pc ON p.id = pc.player_id
-        WHERE pc.id IS NULL
-    """)
-    total_without_clubs = cursor.fetchone()[0]
+    pending = get_players_without_clubs(conn)
+    total_without_clubs = len(pending)
 
     print(f"\nPlayers without club history: {total_without_clubs}")
 
@@ -151,62 +202,45 @@ def main():
         print("All players already have club histories!")
         return
 
-    batch_size = 50  # Number of players per SPARQL query
+    batch_size = 200  # Number of players per SPARQL query (halved on timeout)
+    round_size = batch_size * SPARQL_WORKERS  # One batch per worker
     processed = 0
     total_clubs_added = 0
 
-    while True:
-        # Get batch of players without club history
-        players = get_players_without_clubs(conn, limit=batch_size)
-
-        if not players:
-            break
-
-        player_ids = {row[1]: row[0] for row in players}  # wikidata_id -> db_id
-        wikidata_ids = list(player_ids.keys())
-
-        print(f"\nFetching clubs for batch of {len(wikidata_ids)} players...")
-
-        # Fetch club histories in batch
-        club_histories = fetch_club_histories_batch(wikidata_ids)
-
-        # Insert clubs and relationships
-        for wikidata_id, clubs in club_histories.items():
-            player_db_id = player_ids.get(wikidata_id)
-            if not player_db_id:
-                continue
-
-            for club in clubs:
-                club_db_id = insert_club(conn, club)
-                if club_db_id:
-                    insert_player_club(conn, player_db_id, club_db_id, club)
-                    total_clubs_added += 1
-
-        # For players with no clubs found, insert a placeholder to mark them as processed
-        # (so they don't get queried again)
-        players_without_clubs = 0
-        for wikidata_id in wikidata_ids:
-            if wikidata_id not in club_histories:
-                player_db_id = player_ids.get(wikidata_id)
-                if player_db_id:
-                    mark_player_no_clubs(conn, player_db_id)
-                    players_without_clubs += 1
-
-        if players_without_clubs > 0:
-            print(f"  Marked {players_without_clubs} players as having no clubs in Wikidata")
-
-        conn.commit()
-        processed += len(players)
-
-        print(f"  Processed {processed} players, added {total_clubs_added} club relationships")
-
-        # Be nice to Wikidata
-        time.sleep(1)
-
-        # Check if we're done
-        remaining = get_players_without_clubs(conn, limit=1)
-        if not remaining:
-            break
+    player_ids = {wikidata_id: player_id for player_id, wikidata_id in pending}
+    # Most clubs recur across many players, so resolve them from memory
+    club_ids = dict(conn.execute("SELECT wikidata_id, id FROM clubs").fetchall())
+
+    # Queries run concurrently; all database writes stay on this thread
+    with ThreadPoolExecutor(max_workers=SPARQL_WORKERS) as executor:
+        for round_start in range(0, total_without_clubs, round_size):
+            wikidata_ids = [row[1] for row in pending[round_start:round_start + round_size]]
+
+            print(f"\nFetching clubs for {len(wikidata_ids)} players in batches of {batch_size}...")
+
+            futures = {
+                executor.submit(fetch_club_histories_batch, batch): batch
+                for batch in (
+                    wikidata_ids[i:i + batch_size]
+                    for i in range(0, len(wikidata_ids), batch_size)
+                )
+            }
+            for future in as_completed(futures):
+                batch = futures[future]
+                clubs_added, players_without_clubs = store_club_histories(
+                    conn, player_ids, batch, future.result(), club_ids
+                )
+                total_clubs_added += clubs_added
+
+                if players_without_clubs > 0:
+                    print(f"  Marked {players_without_clubs} players as having no clubs in Wikidata")
+
+                processed += len(batch)
+                print(f"  Processed {processed} players, added {total_clubs_added} club relationships")
+
+            # Be nice to Wikidata
+            if round_start + round_size < total_without_clubs:
+                time.sleep(1)
 
     conn.close()
 
@@ -12,9 +12,24 @@ Usage:
 import json
 import re
 import sqlite3
-import unicodedata
+import sys
+import zlib
+from functools import lru_cache
 from pathlib import Path
 
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from app.services.fuzzy_matching import normalize_name as _normalize_name
+# footballdata.db's schema (including the normalized_name cache columns) is
+# owned by the extraction script
+from extract_footballdata import init_db as init_fd_db
+
 GAME_DB_PATH = Path(__file__).parent.parent / "data" / "players.db"
 FD_DB_PATH = Path(__file__).parent.parent / "data" / "footballdata.db"
 
@@ -272,26 +287,38 @@ NATIONAL_TEAMS = {
 }
 
 
-def normalize_name(name: str) -> str:
-    """Normalize a name for matching (lowercase, no diacritics)."""
-    normalized = unicodedata.normalize('NFKD', name)
-    normalized = ''.join(c for c in normalized if not unicodedata.combining(c))
-    normalized = normalized.lower().strip()
-    normalized = re.sub(r'\s+', ' ', normalized)
-    return normalized
+# Trailing suffixes like FC, AFC, F.C., A.F.C., SC, etc. They are stripped one
+# after another in this order, so a name ending in two suffixes (e.g. "... sc fc")
+# can lose both; a single alternation would only remove the last one.
+_CLUB_SUFFIX_RES = tuple(
+    re.compile(pattern, re.IGNORECASE)
+    for pattern in (
+        r'\s+f\.?c\.?$', r'\s+a\.?f\.?c\.?$', r'\s+s\.?c\.?$',
+        r'\s+cf$', r'\s+ac$', r'\s+fk$', r'\s+sk$',
+        r'\s+\(football club\)$', r'\s+\(football\)$',
+    )
+)
+# Last characters a suffix above can end with. '$' also matches before a
+# trailing newline, and IGNORECASE lets 'k' match the Kelvin sign.
+_CLUB_SUFFIX_TAILS = frozenset('cCfFkK\u212a.)\n')
+
+
+# Both helpers are pure and see the same club and player names many times per
+# run (aliases, FD teams, bootstrap targets, persons across seasons), so
+# results are memoized for the lifetime of the script. normalize_name is the
+# app's, whose translate table handles Latin names without NFKD.
+normalize_name = lru_cache(maxsize=None)(_normalize_name)
 
 
+@lru_cache(maxsize=None)
 def strip_club_suffixes(name: str) -> str:
     """Strip common club suffixes for fuzzy matching."""
-    # Remove trailing suffixes like FC, AFC, F.C., A.F.C., SC, etc.
-    suffixes = [
-        r'\s+f\.?c\.?$', r'\s+a\.?f\.?c\.?$', r'\s+s\.?c\.?$',
-        r'\s+cf$', r'\s+ac$', r'\s+fk$', r'\s+sk$',
-        r'\s+\(football club\)$', r'\s+\(football\)$',
-    ]
+    if not name or name[-1] not in _CLUB_SUFFIX_TAILS:
+        # No suffix pattern can match, so skip the regex passes
+        return name.strip()
     result = name
-    for suffix in suffixes:
-        result = re.sub(suffix, '', result, flags=re.IGNORECASE)
+    for suffix_re in _CLUB_SUFFIX_RES:
+        result = suffix_re.sub('', result)
     return result.strip()
 
 
@@ -304,13 +331,18 @@ def build_person_team_seasons(fd_conn: sqlite3.Connection) -> dict[int, list[tup
     """
     person_teams: dict[int, list[tuple[int, int]]] = {}
 
-    rows = fd_conn.execute(
+    # Iterate the cursor rather than fetchall() so only one response is
+    # held (and decompressed) at a time
+    cursor = fd_conn.execute(
         "SELECT response_json FROM api_responses "
         "WHERE endpoint LIKE '%/teams' AND http_status = 200"
-    ).fetchall()
+    )
 
-    for (raw_json,) in rows:
-        data = json.loads(raw_json)
+    for (raw_json,) in cursor:
+        # extract_footballdata stores responses zlib-compressed (older rows as text)
+        if isinstance(raw_json, bytes):
+            raw_json = zlib.decompress(raw_json)
+        data = _json_loads(raw_json)
         season_info = data.get("season", {})
         season_start = season_info.get("startDate", "")[:4]
         if not season_start:
@@ -356,6 +388,11 @@ def step1_schema_migration(game_conn: sqlite3.Connection):
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_club_aliases_normalized ON club_aliases(normalized_name)")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_club_aliases_club ON club_aliases(club_id)")
 
+    # Step 4 reads and updates player_clubs by player (and player + club, which
+    # the UNIQUE(player_id, club_id, start_date) index already covers). Older
+    # databases may predate this index.
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_player_clubs_player ON player_clubs(player_id)")
+
     # Populate initial aliases from existing clubs (source='wikidata')
     existing = cursor.execute("SELECT COUNT(*) FROM club_aliases WHERE source = 'wikidata'").fetchone()[0]
     if existing == 0:
@@ -368,7 +405,27 @@ def step1_schema_migration(game_conn: sqlite3.Connection):
     else:
         print(f"  Wikidata aliases already populated ({existing} entries)")
 
-    game_conn.commit()
+    # Refresh planner statistics for the join-heavy steps that follow
+    cursor.execute("ANALYZE main")
+
+
+def step1_cache_fd_normalized_names(fd_conn: sqlite3.Connection):
+    """
+    Fill in normalize_name(name) on footballdata.db's persons and teams.
+
+    Only rows without a cached value are normalized, so re-runs skip the
+    work. extract_footballdata's schema declares the columns, and a trigger
+    clears a row's value when its name changes; clear the columns by hand
+    if normalize_name changes.
+    """
+    fd_conn.create_function("normalize_name", 1, normalize_name, deterministic=True)
+    for table in ("persons", "teams"):
+        cursor = fd_conn.execute(
+            f"UPDATE {table} SET normalized_name = normalize_name(name) "
+            "WHERE normalized_name IS NULL AND name IS NOT NULL"
+        )
+        print(f"  Normalized {cursor.rowcount} footballdata {table} names")
+    fd_conn.commit()
 
 
 def step2_match_clubs(game_conn: sqlite3.Connection, fd_conn: sqlite3.Connection) -> dict[int, int]:
@@ -379,72 +436,84 @@ def step2_match_clubs(game_conn: sqlite3.Connection, fd_conn: sqlite3.Connection
 
     game_cursor = game_conn.cursor()
 
-    # Build lookup: normalized_name -> club_id from club_aliases
-    alias_rows = game_cursor.execute(
-        "SELECT club_id, normalized_name FROM club_aliases"
-    ).fetchall()
-    alias_lookup: dict[str, int] = {}
-    for club_id, norm_name in alias_rows:
-        alias_lookup[norm_name] = club_id
-
-    # Also build stripped-name lookup
-    stripped_lookup: dict[str, int] = {}
-    for norm_name, club_id in alias_lookup.items():
-        stripped = strip_club_suffixes(norm_name)
-        if stripped not in stripped_lookup:
-            stripped_lookup[stripped] = club_id
-
-    # Load FD teams
-    fd_teams = fd_conn.execute("SELECT id, name FROM teams").fetchall()
+    game_conn.create_function("strip_suffix", 1, strip_club_suffixes, deterministic=True)
 
-    fd_to_game: dict[int, int] = {}
-    matched = 0
-    unmatched = []
+    # Load FD teams into a temp table with their normalized, suffix-stripped
+    # and bootstrap-target forms so the matching runs as indexed SQL lookups
+    fd_teams = fd_conn.execute("SELECT id, name, normalized_name FROM teams").fetchall()
+    team_rows = []
     skipped_national = 0
-
-    for fd_id, fd_name in fd_teams:
+    for fd_id, fd_name, fd_normalized in fd_teams:
         # Skip national teams
         if fd_name in NATIONAL_TEAMS:
             skipped_national += 1
             continue
+        boot_normalized, boot_stripped = BOOTSTRAP_ALIASES_NORMALIZED.get(fd_name, (None, None))
+        team_rows.append((
+            fd_id, fd_name, fd_normalized, strip_club_suffixes(fd_normalized),
+            boot_normalized, boot_stripped,
+        ))
+
+    game_cursor.execute("""
+        CREATE TEMP TABLE fd_teams_norm (
+            fd_id INTEGER PRIMARY KEY,
+            fd_name TEXT,
+            normalized TEXT,
+            stripped TEXT,
+            boot_normalized TEXT,
+            boot_stripped TEXT,
+            club_id INTEGER
+        )
+    """)
+    game_cursor.executemany(
+        "INSERT INTO fd_teams_norm (fd_id, fd_name, normalized, stripped, boot_normalized, boot_stripped) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        team_rows
+    )
+
+    # Stripped-name lookup: each alias name resolves to its newest row's club,
+    # and the first alias name (by insertion) to strip to a key claims it
+    game_cursor.execute("CREATE TEMP TABLE alias_stripped (stripped TEXT PRIMARY KEY, club_id INTEGER)")
+    game_cursor.execute("""
+        INSERT OR IGNORE INTO alias_stripped (stripped, club_id)
+        SELECT strip_suffix(g.normalized_name), ca.club_id
+        FROM (
+            SELECT normalized_name, MIN(id) AS first_id, MAX(id) AS last_id
+            FROM club_aliases GROUP BY normalized_name
+        ) g
+        JOIN club_aliases ca ON ca.id = g.last_id
+        ORDER BY g.first_id
+    """)
 
-        fd_normalized = normalize_name(fd_name)
-
-        # Try 1: exact normalized match in aliases
-        if fd_normalized in alias_lookup:
-            fd_to_game[fd_id] = alias_lookup[fd_normalized]
-            matched += 1
-            _insert_fd_alias(game_cursor, alias_lookup[fd_normalized], fd_name, fd_normalized, fd_id)
-            continue
-
-        # Try 2: stripped suffix match
-        fd_stripped = strip_club_suffixes(fd_normalized)
-        if fd_stripped in stripped_lookup:
-            fd_to_game[fd_id] = stripped_lookup[fd_stripped]
-            matched += 1
-            _insert_fd_alias(game_cursor, stripped_lookup[fd_stripped], fd_name, fd_normalized, fd_id)
-            continue
-
-        # Try 3: bootstrap alias mapping
-        if fd_name in BOOTSTRAP_ALIASES:
-            target_name = BOOTSTRAP_ALIASES[fd_name]
-            target_normalized = normalize_name(target_name)
-            if target_normalized in alias_lookup:
-                fd_to_game[fd_id] = alias_lookup[target_normalized]
-                matched += 1
-                _insert_fd_alias(game_cursor, alias_lookup[target_normalized], fd_name, fd_normalized, fd_id)
-                continue
-            # Also try stripped
-            target_stripped = strip_club_suffixes(target_normalized)
-            if target_stripped in stripped_lookup:
-                fd_to_game[fd_id] = stripped_lookup[target_stripped]
-                matched += 1
-                _insert_fd_alias(game_cursor, stripped_lookup[target_stripped], fd_name, fd_normalized, fd_id)
-                continue
+    # Try in order: exact normalized alias (latest alias wins, as in
+    # alias_lookup), stripped suffix match, then the bootstrap target in
+    # both forms
+    game_cursor.execute("""
+        UPDATE fd_teams_norm SET club_id = COALESCE(
+            (SELECT ca.club_id FROM club_aliases ca
+             WHERE ca.normalized_name = fd_teams_norm.normalized ORDER BY ca.id DESC LIMIT 1),
+            (SELECT s.club_id FROM alias_stripped s WHERE s.stripped = fd_teams_norm.stripped),
+            (SELECT ca.club_id FROM club_aliases ca
+             WHERE ca.normalized_name = fd_teams_norm.boot_normalized ORDER BY ca.id DESC LIMIT 1),
+            (SELECT s.club_id FROM alias_stripped s WHERE s.stripped = fd_teams_norm.boot_stripped)
+        )
+    """)
 
-        unmatched.append((fd_id, fd_name))
+    fd_to_game: dict[int, int] = dict(game_cursor.execute(
+        "SELECT fd_id, club_id FROM fd_teams_norm WHERE club_id IS NOT NULL"
+    ).fetchall())
+    matched = len(fd_to_game)
+    unmatched = game_cursor.execute(
+        "SELECT fd_id, fd_name FROM fd_teams_norm WHERE club_id IS NULL ORDER BY fd_id"
+    ).fetchall()
 
-    game_conn.commit()
+    game_cursor.execute("""
+        INSERT OR IGNORE INTO club_aliases (club_id, name, normalized_name, source, external_id)
+        SELECT club_id, fd_name, normalized, 'footballdata', CAST(fd_id AS TEXT)
+        FROM fd_teams_norm WHERE club_id IS NOT NULL ORDER BY fd_id
+    """)
+    game_cursor.execute("DROP TABLE fd_teams_norm")
+    game_cursor.execute("DROP TABLE alias_stripped")
 
     print(f"  Matched: {matched} clubs")
     print(f"  Skipped national teams: {skipped_national}")
@@ -458,76 +527,54 @@ def step2_match_clubs(game_conn: sqlite3.Connection, fd_conn: sqlite3.Connection
     return fd_to_game
 
 
-def _insert_fd_alias(cursor, club_id: int, fd_name: str, fd_normalized: str, fd_id: int):
-    """Insert a footballdata alias for a club."""
-    try:
-        cursor.execute(
-            "INSERT OR IGNORE INTO club_aliases (club_id, name, normalized_name, source, external_id) "
-            "VALUES (?, ?, ?, 'footballdata', ?)",
-            (club_id, fd_name, fd_normalized, str(fd_id))
-        )
-    except sqlite3.IntegrityError:
-        pass
-
-
-def step3_match_players(
-    game_conn: sqlite3.Connection, fd_conn: sqlite3.Connection
-) -> dict[int, int]:
+def step3_match_players(game_conn: sqlite3.Connection) -> dict[int, int]:
     """
     Match FD persons to game DB players. Returns fd_person_id -> game_player_id mapping.
+
+    footballdata.db must be attached to game_conn as "fd" (see main), so
+    persons are joined against players in SQL.
     """
     print("\n=== Step 3: Match players ===")
 
-    # Build game DB lookup: normalized_name -> [(player_id, birth_date), ...]
     game_cursor = game_conn.cursor()
-    game_rows = game_cursor.execute(
-        "SELECT id, normalized_name, birth_date FROM players"
-    ).fetchall()
-
-    game_name_lookup: dict[str, list[tuple[int, str | None]]] = {}
-    for pid, norm_name, birth_date in game_rows:
-        game_name_lookup.setdefault(norm_name, []).append((pid, birth_date))
 
-    # Load FD persons
-    fd_persons = fd_conn.execute(
-        "SELECT id, name, date_of_birth FROM persons"
-    ).fetchall()
+    # Per person: a unique name match wins outright; several candidates are
+    # disambiguated only if exactly one of them shares the person's DOB.
+    # Nameless persons join nothing and come out unmatched. The cursor is
+    # consumed as a stream, one row per person.
+    cursor = game_cursor.execute("""
+        SELECT fd_id,
+               CASE WHEN n = 1 THEN only_id WHEN n > 1 AND n_dob = 1 THEN dob_id END,
+               CASE WHEN n = 0 THEN 'unmatched' WHEN n = 1 THEN 'unique'
+                    WHEN n_dob = 1 THEN 'dob' ELSE 'ambiguous' END
+        FROM (
+            SELECT p.id AS fd_id,
+                   COUNT(g.id) AS n,
+                   MIN(g.id) AS only_id,
+                   COUNT(CASE WHEN p.date_of_birth != '' AND g.birth_date = p.date_of_birth THEN 1 END) AS n_dob,
+                   MIN(CASE WHEN p.date_of_birth != '' AND g.birth_date = p.date_of_birth THEN g.id END) AS dob_id
+            FROM fd.persons p
+            LEFT JOIN main.players g
+                ON g.normalized_name = p.normalized_name AND p.name != ''
+            GROUP BY p.id
+        )
+        ORDER BY fd_id
+    """)
 
     fd_to_game: dict[int, int] = {}
-    matched_unique = 0
-    matched_dob = 0
-    ambiguous = 0
-    unmatched = 0
-
-    for fd_id, fd_name, fd_dob in fd_persons:
-        if not fd_name:
-            unmatched += 1
-            continue
-
-        fd_normalized = normalize_name(fd_name)
-        candidates = game_name_lookup.get(fd_normalized, [])
-
-        if len(candidates) == 1:
-            fd_to_game[fd_id] = candidates[0][0]
-            matched_unique += 1
-        elif len(candidates) > 1:
-            # Try to disambiguate by DOB
-            if fd_dob:
-                dob_matches = [
-                    (pid, bd) for pid, bd in candidates
-                    if bd and bd == fd_dob
-                ]
-                if len(dob_matches) == 1:
-                    fd_to_game[fd_id] = dob_matches[0][0]
-                    matched_dob += 1
-                else:
-                    ambiguous += 1
-            else:
-                ambiguous += 1
-        else:
-            unmatched += 1
-
-    print(f"  FD persons: {len(fd_persons)}")
+    outcomes = {"unique": 0, "dob": 0, "ambiguous": 0, "unmatched": 0}
+    total_persons = 0
+    for fd_id, player_id, outcome in cursor:
+        total_persons += 1
+        if player_id is not None:
+            fd_to_game[fd_id] = player_id
+        outcomes[outcome] += 1
+    matched_unique = outcomes["unique"]
+    matched_dob = outcomes["dob"]
+    ambiguous = outcomes["ambiguous"]
+    unmatched = outcomes["unmatched"]
+
+    print(f"  FD persons: {total_persons}")
     print(f"  Matched (unique name): {matched_unique}")
     print(f"  Matched (DOB disambig): {matched_dob}")
     print(f"  Ambiguous (skipped): {ambiguous}")
@@ -563,6 +610,30 @@ def step4_update_associations(
     skipped_no_club = 0
     players_processed = 0
 
+    # Writes are collected per kind and applied in bulk by _apply_association_writes
+    link_inserts: list[tuple[int, int, str]] = []  # (player_id, club_id, start_date)
+    end_date_updates: list[tuple[str, int]] = []  # (end_date, player_clubs.id)
+    stale_updates: list[tuple[int]] = []  # (player_clubs.id,)
+    club_spans: list[tuple[int, int, int, int]] = []  # (player_id, club_id, first, last season)
+
+    players_with_pending_writes: set[int] = set()
+
+    # Prefetch the club history of every matched player, in chunks that stay
+    # under SQLite's bound-parameter limit
+    matched_player_ids = list(set(fd_player_map.values()))
+    existing_by_player: dict[int, list[tuple]] = {pid: [] for pid in matched_player_ids}
+    for i in range(0, len(matched_player_ids), 900):
+        chunk = matched_player_ids[i:i + 900]
+        placeholders = ",".join("?" * len(chunk))
+        for pc_id, player_id, club_id, start_date, end_date, is_national_team, is_stale in game_cursor.execute(
+            "SELECT id, player_id, club_id, start_date, end_date, is_national_team, is_stale "
+            f"FROM player_clubs WHERE player_id IN ({placeholders})",
+            chunk
+        ):
+            existing_by_player[player_id].append(
+                (pc_id, club_id, start_date, end_date, is_national_team, is_stale)
+            )
+
     for fd_person_id, game_player_id in fd_player_map.items():
         fd_memberships = person_team_seasons.get(fd_person_id, [])
         if not fd_memberships:
@@ -570,102 +641,89 @@ def step4_update_associations(
 
         players_processed += 1
 
+        # Several FD persons can map to the same game player; the later ones
+        # must see the links written for the earlier ones
+        if game_player_id in players_with_pending_writes:
+            counts = _apply_association_writes(
+                game_cursor, link_inserts, end_date_updates, stale_updates, club_spans
+            )
+            added += counts[0]
+            end_dates_set += counts[1]
+            stale_marked += counts[2]
+            players_with_pending_writes.clear()
+        players_with_pending_writes.add(game_player_id)
+
         # Get the set of game club IDs this player is at according to FD
-        fd_game_clubs: dict[int, list[int]] = {}  # game_club_id -> [seasons]
+        fd_club_minmax: dict[int, tuple[int, int]] = {}  # game_club_id -> (first, last season)
         for fd_team_id, season in fd_memberships:
             game_club_id = fd_club_map.get(fd_team_id)
             if game_club_id:
-                fd_game_clubs.setdefault(game_club_id, []).append(season)
+                cur = fd_club_minmax.get(game_club_id)
+                if cur is None:
+                    fd_club_minmax[game_club_id] = (season, season)
+                else:
+                    fd_club_minmax[game_club_id] = (min(cur[0], season), max(cur[1], season))
             else:
                 skipped_no_club += 1
 
-        if not fd_game_clubs:
+        if not fd_club_minmax:
             continue
 
-        # Get current game DB club history for this player
-        existing_rows = game_cursor.execute(
-            "SELECT id, club_id, start_date, end_date, is_national_team, is_stale "
-            "FROM player_clubs WHERE player_id = ?",
-            (game_player_id,)
-        ).fetchall()
+        # Get current game DB club history for this player. The prefetched rows
+        # are used once; a player seen again is re-read, as this run may have
+        # written to its history since
+        existing_rows = existing_by_player.pop(game_player_id, None)
+        if existing_rows is None:
+            existing_rows = game_cursor.execute(
+                "SELECT id, club_id, start_date, end_date, is_national_team, is_stale "
+                "FROM player_clubs WHERE player_id = ?",
+                (game_player_id,)
+            ).fetchall()
 
         existing_club_ids = {row[1] for row in existing_rows}
 
         # Add missing club links
-        for game_club_id, seasons in fd_game_clubs.items():
+        for game_club_id, (earliest_season, _) in fd_club_minmax.items():
             if game_club_id in existing_club_ids:
                 already_present += 1
                 continue
 
             # Insert one player-club link using the earliest season
-            earliest_season = min(set(seasons))
-            start_date = f"{earliest_season}-08-01"
-            try:
-                game_cursor.execute(
-                    "INSERT OR IGNORE INTO player_clubs "
-                    "(player_id, club_id, start_date, end_date, is_national_team, is_stale) "
-                    "VALUES (?, ?, ?, NULL, 0, 0)",
-                    (game_player_id, game_club_id, start_date)
-                )
-                if game_cursor.rowcount > 0:
-                    added += 1
-            except sqlite3.IntegrityError:
-                pass
+            link_inserts.append((game_player_id, game_club_id, f"{earliest_season}-08-01"))
 
         # Handle existing clubs not in FD data (player moved on):
         # - If the record has a start_date, we can infer an end_date from when
         #   the earliest FD club started (e.g. Anderlecht 2020-? → 2020-2023)
         # - If the record has no start_date, mark as stale (truly unclear)
-        earliest_fd_season = min(s for seasons in fd_game_clubs.values() for s in seasons)
+        earliest_fd_season = min(first for first, _ in fd_club_minmax.values())
         earliest_fd_date = f"{earliest_fd_season}-08-01"
 
         for row in existing_rows:
             pc_id, club_id, start_date, end_date, is_national_team, is_stale = row
             if is_national_team or is_stale or end_date is not None:
                 continue
-            if club_id not in fd_game_clubs:
+            if club_id not in fd_club_minmax:
                 if start_date:
                     # Has a start date — set end_date to when the FD era begins
-                    game_cursor.execute(
-                        "UPDATE player_clubs SET end_date = ? WHERE id = ?",
-                        (earliest_fd_date, pc_id)
-                    )
-                    end_dates_set += 1
+                    end_date_updates.append((earliest_fd_date, pc_id))
                 else:
                     # No start date — truly stale/unclear
-                    game_cursor.execute(
-                        "UPDATE player_clubs SET is_stale = 1 WHERE id = ?",
-                        (pc_id,)
-                    )
-                    stale_marked += 1
+                    stale_updates.append((pc_id,))
 
         # Infer end dates from sequential transfers within FD data.
         # If a player was at Club A in seasons [2023,2024] and Club B in [2025],
-        # Club A's end_date should be set to when Club B started.
-        if len(fd_game_clubs) > 1:
-            # Build timeline: [(earliest_season, latest_season, club_id)]
-            club_timeline = []
-            for game_club_id, seasons in fd_game_clubs.items():
-                club_timeline.append((min(seasons), max(seasons), game_club_id))
-            club_timeline.sort(key=lambda x: x[0])
-
-            for i in range(len(club_timeline) - 1):
-                curr_start, curr_end, curr_club_id = club_timeline[i]
-                next_start, _, _ = club_timeline[i + 1]
-
-                # Only set end date if the next club started in a later season
-                if next_start > curr_end:
-                    end_date = f"{next_start}-08-01"
-                    game_cursor.execute(
-                        "UPDATE player_clubs SET end_date = ? "
-                        "WHERE player_id = ? AND club_id = ? AND end_date IS NULL "
-                        "AND is_stale = 0",
-                        (end_date, game_player_id, curr_club_id)
-                    )
-                    if game_cursor.rowcount > 0:
-                        end_dates_set += 1
-
-    game_conn.commit()
+        # Club A's end_date should be set to when Club B started. The
+        # timeline itself is resolved in SQL by _apply_association_writes.
+        if len(fd_club_minmax) > 1:
+            for game_club_id, (first, last) in fd_club_minmax.items():
+                club_spans.append((game_player_id, game_club_id, first, last))
+
+    counts = _apply_association_writes(
+        game_cursor, link_inserts, end_date_updates, stale_updates, club_spans
+    )
+    added += counts[0]
+    end_dates_set += counts[1]
+    stale_marked += counts[2]
 
     print(f"  Players processed: {players_processed}")
     print(f"  New club links added: {added}")
@@ -675,6 +733,73 @@ def step4_update_associations(
     print(f"  Skipped (no club match): {skipped_no_club}")
 
 
+def _apply_association_writes(
+    cursor,
+    link_inserts: list[tuple[int, int, str]],
+    end_date_updates: list[tuple[str, int]],
+    stale_updates: list[tuple[int]],
+    club_spans: list[tuple[int, int, int, int]],
+) -> tuple[int, int, int]:
+    """
+    Apply the player_clubs writes collected by step 4, then clear the lists.
+    Returns (links added, end dates set, links marked stale).
+    """
+    added = 0
+    try:
+        cursor.executemany(
+            "INSERT OR IGNORE INTO player_clubs "
+            "(player_id, club_id, start_date, end_date, is_national_team, is_stale) "
+            "VALUES (?, ?, ?, NULL, 0, 0)",
+            link_inserts
+        )
+        added = cursor.rowcount
+    except sqlite3.IntegrityError:
+        pass
+
+    cursor.executemany("UPDATE player_clubs SET end_date = ? WHERE id = ?", end_date_updates)
+    end_dates_set = len(end_date_updates)
+    cursor.executemany("UPDATE player_clubs SET is_stale = 1 WHERE id = ?", stale_updates)
+    stale_marked = len(stale_updates)
+
+    # Sequential transfers: order each player's FD clubs by first season (ties
+    # keep collection order) and close a club when the next one starts in a
+    # later season than its last. Runs after the inserts so newly added links
+    # can get an end date too; a transfer counts once however many of the
+    # player's rows for that club it closes.
+    cursor.execute(
+        "CREATE TEMP TABLE IF NOT EXISTS fd_club_spans ("
+        "seq INTEGER PRIMARY KEY, player_id INTEGER, club_id INTEGER, "
+        "first_season INTEGER, last_season INTEGER)"
+    )
+    cursor.executemany(
+        "INSERT INTO fd_club_spans (player_id, club_id, first_season, last_season) "
+        "VALUES (?, ?, ?, ?)",
+        club_spans
+    )
+    closed = cursor.execute("""
+        UPDATE player_clubs SET end_date = t.next_start || '-08-01'
+        FROM (
+            SELECT player_id, club_id, last_season,
+                   LEAD(first_season) OVER (
+                       PARTITION BY player_id ORDER BY first_season, seq
+                   ) AS next_start
+            FROM fd_club_spans
+        ) t
+        WHERE t.next_start > t.last_season
+          AND player_clubs.player_id = t.player_id
+          AND player_clubs.club_id = t.club_id
+          AND player_clubs.end_date IS NULL
+          AND player_clubs.is_stale = 0
+        RETURNING player_clubs.player_id, player_clubs.club_id
+    """).fetchall()
+    end_dates_set += len(set(map(tuple, closed)))
+    cursor.execute("DELETE FROM fd_club_spans")
+
+    for pending in (link_inserts, end_date_updates, stale_updates, club_spans):
+        pending.clear()
+    return added, end_dates_set, stale_marked
+
+
 def main():
     print("=== Merging football-data.org data into players.db ===\n")
 
@@ -687,15 +812,30 @@ def main():
 
     game_conn = sqlite3.connect(str(GAME_DB_PATH))
     game_conn.row_factory = sqlite3.Row
-    fd_conn = sqlite3.connect(str(FD_DB_PATH))
-    fd_conn.row_factory = sqlite3.Row
-
+    # Bulk-write settings for this connection only. players.db stays in WAL
+    # (the live game database; journal_mode=OFF could corrupt it on a crash),
+    # where NORMAL sync skips the per-commit fsync but stays crash-safe.
+    game_conn.execute("PRAGMA synchronous=NORMAL")
+    game_conn.execute("PRAGMA temp_store=MEMORY")
+    game_conn.execute("PRAGMA cache_size=-65536")
+    # Through the extraction script, so databases it created before the
+    # normalized_name columns existed are brought up to date
+    fd_conn = init_fd_db(str(FD_DB_PATH))
+    # Attached up front: ATTACH is not allowed once the migration's single
+    # transaction has begun
+    game_conn.execute("ATTACH DATABASE ? AS fd", (str(FD_DB_PATH),))
+
+    # All steps run in one transaction on game_conn and are committed once at
+    # the end. Later steps see the earlier steps' uncommitted writes through
+    # the same connection; if the script fails midway nothing is committed and
+    # it can simply be re-run.
     print("=== Step 1: Schema migration ===")
+    step1_cache_fd_normalized_names(fd_conn)
     step1_schema_migration(game_conn)
 
     fd_club_map = step2_match_clubs(game_conn, fd_conn)
 
-    fd_player_map = step3_match_players(game_conn, fd_conn)
+    fd_player_map = step3_match_players(game_conn)
 
     step4_update_associations(game_conn, fd_conn, fd_player_map, fd_club_map)
 
@@ -714,10 +854,19 @@ def main():
     print(f"  Football-data aliases: {fd_alias_count}")
     print(f"  Stale player-club records: {stale_count}")
 
+    game_conn.commit()
     game_conn.close()
     fd_conn.close()
     print("\nDone.")
 
 
+# BOOTSTRAP_ALIASES targets in (normalized, suffix-stripped) form, computed
+# once the normalization helpers above are defined.
+BOOTSTRAP_ALIASES_NORMALIZED = {
+    fd_name: (normalize_name(target), strip_club_suffixes(normalize_name(target)))
+    for fd_name, target in BOOTSTRAP_ALIASES.items()
+}
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,57 @@
+"""
+Tests for the database search helpers.
+
+Run with: pytest backend/tests/test_database.py -v
+"""
+
+import pytest
+import app.models.database as database
+from app.services.fuzzy_matching import normalize_name
+
+
+PLAYERS = [
+    ("Q1", "Cristiano Ronaldo"),
+    ("Q2", "Lionel Messi"),
+    ("Q3", "Christian Pulisic"),
+    ("Q4", "Ronaldinho"),
+]
+
+
+@pytest.fixture
+def players_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DATABASE_PATH", tmp_path / "players.db")
+    database.init_database()
+    conn = database.get_db_connection()
+    conn.executemany(
+        "INSERT INTO players (wikidata_id, name, normalized_name) VALUES (?, ?, ?)",
+        [(wikidata_id, name, normalize_name(name)) for wikidata_id, name in PLAYERS]
+    )
+    conn.commit()
+    conn.close()
+    return database.DATABASE_PATH
+
+
+def fuzzy_names(query):
+    return [player["name"] for player in database.fts_search_fuzzy(query)]
+
+
+class TestFtsSearchFuzzy:
+    """Tests for the FTS + Levenshtein fuzzy search."""
+
+    def test_prefix_typo(self, players_db):
+        assert "Cristiano Ronaldo" in fuzzy_names("christiano")
+
+    def test_phonetic_typo_at_start(self, players_db):
+        # No prefix variation of "kristiano" reaches "cristiano"; only the
+        # Metaphone buckets do
+        assert "Cristiano Ronaldo" in fuzzy_names("kristiano")
+
+    def test_buckets_follow_renames(self, players_db):
+        assert "Cacau" not in fuzzy_names("kacau")
+
+        conn = database.get_db_connection()
+        conn.execute("UPDATE players SET name = 'Cacau', normalized_name = 'cacau' WHERE wikidata_id = 'Q4'")
+        conn.commit()
+        conn.close()
+
+        assert "Cacau" in fuzzy_names("kacau")
@@ -7,54 +7,100 @@ Run with: pytest backend/tests/test_fuzzy_matching.py -v
 import pytest
 from app.services.fuzzy_matching import (
     levenshtein_distance,
+    _levenshtein_distance_py,
     soundex,
     metaphone,
     get_edit_threshold,
     fuzzy_match,
+    _fuzzy_match_precomputed,
     fuzzy_match_name,
+    normalize_name,
     FuzzyMatchResult,
 )
 
 
-class TestLevenshteinDistance:
-    """Tests for Levenshtein distance calculation."""
+class TestNormalizeName:
+    """Tests for name normalization."""
 
-    def test_identical_strings(self):
-        assert levenshtein_distance("hello", "hello") == 0
-        assert levenshtein_distance("ronaldo", "ronaldo") == 0
+    def test_strips_diacritics(self):
+        assert normalize_name("Mesut Özil") == "mesut ozil"
+        assert normalize_name("Wojciech Szczęsny") == "wojciech szczesny"
+        assert normalize_name("Zlatan Ibrahimović") == "zlatan ibrahimovic"
 
-    def test_single_insertion(self):
-        assert levenshtein_distance("messi", "messis") == 1
-        assert levenshtein_distance("neymar", "neymars") == 1
+    def test_collapses_whitespace(self):
+        assert normalize_name("  Kevin   De\tBruyne ") == "kevin de bruyne"
 
-    def test_single_deletion(self):
-        assert levenshtein_distance("messi", "mesi") == 1
-        assert levenshtein_distance("ronaldo", "ronldo") == 1
+    def test_characters_outside_latin_range(self):
+        # Falls back to full Unicode decomposition
+        assert normalize_name("Nguyễn Công Phượng") == "nguyen cong phuong"
 
-    def test_single_substitution(self):
-        assert levenshtein_distance("messi", "messo") == 1
-        assert levenshtein_distance("ronaldo", "ronalda") == 1
+    def test_empty_string(self):
+        assert normalize_name("") == ""
+
+
+# (s1, s2, expected distance)
+LEVENSHTEIN_CASES = [
+    # Identical strings
+    ("hello", "hello", 0),
+    ("ronaldo", "ronaldo", 0),
+    # Single insertion
+    ("messi", "messis", 1),
+    ("neymar", "neymars", 1),
+    # Single deletion
+    ("messi", "mesi", 1),
+    ("ronaldo", "ronldo", 1),
+    # Single substitution
+    ("messi", "messo", 1),
+    ("ronaldo", "ronalda", 1),
+    # Multiple edits
+    ("ronaldinho", "ronaldino", 1),
+    ("cristiano", "christiano", 1),  # insertion
+    ("szczesny", "szczsny", 1),  # 1 deletion
+    # Transposition counts as 2 edits in standard Levenshtein
+    ("ronaldo", "ronalod", 2),
+    # Completely different
+    ("messi", "ronaldo", 7),
+    # Empty strings
+    ("", "hello", 5),
+    ("hello", "", 5),
+    ("", "", 0),
+    # Levenshtein is case-sensitive
+    ("Messi", "messi", 1),
+]
+
+# (s1, s2, max_distance, expected distance)
+BANDED_LEVENSHTEIN_CASES = [
+    # Distances within the limit are exact
+    ("ronaldinho", "ronaldino", 2, 1),
+    ("ronaldo", "ronalod", 2, 2),
+    ("", "abc", 3, 3),
+    # Anything beyond the limit is reported as max_distance + 1
+    ("messi", "ronaldo", 2, 3),
+    ("ronaldo", "ronaldinho", 1, 2),
+    ("", "hello", 0, 1),
+]
 
-    def test_multiple_edits(self):
-        assert levenshtein_distance("ronaldinho", "ronaldino") == 1
-        assert levenshtein_distance("cristiano", "christiano") == 1  # insertion
-        assert levenshtein_distance("szczesny", "szczsny") == 1  # 1 deletion
 
-    def test_transposition(self):
-        # Transposition counts as 2 edits in standard Levenshtein
-        assert levenshtein_distance("ronaldo", "ronalod") == 2
+class TestLevenshteinDistance:
+    """Tests for Levenshtein distance calculation."""
 
-    def test_completely_different(self):
-        assert levenshtein_distance("messi", "ronaldo") == 7
+    @pytest.mark.parametrize("s1,s2,expected", LEVENSHTEIN_CASES)
+    def test_distance(self, s1, s2, expected):
+        assert levenshtein_distance(s1, s2) == expected
 
-    def test_empty_string(self):
-        assert levenshtein_distance("", "hello") == 5
-        assert levenshtein_distance("hello", "") == 5
-        assert levenshtein_distance("", "") == 0
+    @pytest.mark.parametrize("s1,s2,max_distance,expected", BANDED_LEVENSHTEIN_CASES)
+    def test_max_distance(self, s1, s2, max_distance, expected):
+        assert levenshtein_distance(s1, s2, max_distance=max_distance) == expected
+
+    # levenshtein_distance uses rapidfuzz when it is installed, so check the
+    # pure-Python fallback against the same cases explicitly
+    @pytest.mark.parametrize("s1,s2,expected", LEVENSHTEIN_CASES)
+    def test_python_fallback_distance(self, s1, s2, expected):
+        assert _levenshtein_distance_py(s1, s2) == expected
 
-    def test_case_sensitivity(self):
-        # Levenshtein is case-sensitive
-        assert levenshtein_distance("Messi", "messi") == 1
+    @pytest.mark.parametrize("s1,s2,max_distance,expected", BANDED_LEVENSHTEIN_CASES)
+    def test_python_fallback_max_distance(self, s1, s2, max_distance, expected):
+        assert _levenshtein_distance_py(s1, s2, max_distance=max_distance) == expected
 
 
 class TestSoundex:
@@ -114,26 +160,16 @@ class TestMetaphone:
 class TestEditThreshold:
     """Tests for edit distance threshold calculation."""
 
-    def test_short_names_no_tolerance(self):
+    @pytest.mark.parametrize("length,expected", [
         # Names 4 chars or less: 0 tolerance
-        assert get_edit_threshold(1) == 0
-        assert get_edit_threshold(2) == 0
-        assert get_edit_threshold(3) == 0
-        assert get_edit_threshold(4) == 0
-
-    def test_medium_names_one_edit(self):
+        (1, 0), (2, 0), (3, 0), (4, 0),
         # Names 5-8 chars: 1 edit tolerance
-        assert get_edit_threshold(5) == 1
-        assert get_edit_threshold(6) == 1
-        assert get_edit_threshold(7) == 1
-        assert get_edit_threshold(8) == 1
-
-    def test_long_names_two_edits(self):
+        (5, 1), (6, 1), (7, 1), (8, 1),
         # Names 9+ chars: 2 edits tolerance
-        assert get_edit_threshold(9) == 2
-        assert get_edit_threshold(10) == 2
-        assert get_edit_threshold(15) == 2
-        assert get_edit_threshold(20) == 2
+        (9, 2), (10, 2), (15, 2), (20, 2),
+    ])
+    def test_threshold(self, length, expected):
+        assert get_edit_threshold(length) == expected
 
 
 class TestFuzzyMatch:
@@ -200,6 +236,34 @@ class TestFuzzyMatch:
 
         assert exact.confidence > one_edit.confidence
 
+    def test_result_is_immutable(self):
+        result = fuzzy_match("ronaldo", "ronaldo")
+        assert isinstance(result, FuzzyMatchResult)
+        with pytest.raises(AttributeError):
+            result.is_match = False
+
+    def test_symmetric(self):
+        for query, target in [("ronaldino", "ronaldinho"), ("massi", "messi"),
+                              ("cristiano", "christiano"), ("messi", "ronaldo")]:
+            assert fuzzy_match(query, target) == fuzzy_match(target, query)
+            assert (fuzzy_match(query, target, use_phonetics=False)
+                    == fuzzy_match(target, query, use_phonetics=False))
+
+    def test_precomputed_codes_match_wrapper(self):
+        query_codes = (soundex("christiano"), metaphone("christiano"))
+        for target in ["cristiano", "ronaldo", "christian"]:
+            result = _fuzzy_match_precomputed(
+                "christiano", target,
+                query_codes[0], query_codes[1],
+                soundex(target), metaphone(target)
+            )
+            assert result == fuzzy_match("christiano", target)
+
+    def test_precomputed_empty_codes_disable_phonetics(self):
+        result = _fuzzy_match_precomputed("cristiano", "christiano", "", "", "", "")
+        assert result == fuzzy_match("cristiano", "christiano", use_phonetics=False)
+        assert result.phonetic_match is False
+
 
 class TestFuzzyMatchName:
     """Tests for multi-part name fuzzy matching."""
@@ -241,6 +305,20 @@ class TestFuzzyMatchName:
         assert result.is_match is True
         assert result.edit_distance == 1
 
+    @pytest.mark.parametrize("query,target", [
+        ("lionel messi", "cristiano ronaldo"),
+        ("cacau silva", "kaka silva"),
+        ("mohamed sala", "muhammad salah"),
+    ])
+    def test_early_reject_fields(self, query, target):
+        # Rejected on the whole-string distance alone: phonetic_match is the
+        # usual all-parts test, edit_distance only a lower bound on the sum
+        result = fuzzy_match_name(query, target)
+        part_results = [fuzzy_match(q, t) for q, t in zip(query.split(), target.split())]
+        assert result.is_match is False
+        assert result.phonetic_match == all(r.phonetic_match for r in part_results)
+        assert result.edit_distance <= sum(r.edit_distance for r in part_results)
+
 
 class TestRealWorldExamples:
     """Tests with real player names to verify practical accuracy."""